@@ -1,12 +1,14 @@
 ﻿import asyncio
+import functools
 import json
-import math
 import os
+import re
 import sqlite3
 import sys
 import urllib.parse
-from datetime import datetime, timedelta
-from typing import Any, Dict, List
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Dict, Final, List
 
 import aiohttp
 import base64
@@ -15,6 +17,11 @@ from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except Exception:
+    orjson = None
+
 from .modules.text_parser import parse_text_structure
 from .modules.server_builder import build_server_from_template, create_roles, template_from_guild
 from .modules.ticket_system import handle_ticket_select, send_ticket_panel_to_channel
@@ -24,13 +31,14 @@ from .modules.verify_system import (
     post_verify_panel,
     update_verify_config,
     get_verify_config,
+    get_verify_config_view,
     build_verify_embed,
 )
 from .modules.giveaway import init_giveaway, handle_giveaway_button, start_giveaway, end_giveaway_command as end_gw_command
 from .modules.change_logger import start_change_logger, stop_change_logger
 from .modules.modmail import init_modmail, setup_modmail_commands
 from .modules.reaction_roles import init_reaction_roles, setup_reaction_role_commands
-from .modules.moderation import setup_moderation_commands
+from .modules.moderation import flush_warning_writes, setup_moderation_commands
 from .modules.custom_commands import init_custom_commands, setup_custom_command_commands
 from .modules.economy import init_economy
 from .modules.leveling import init_leveling
@@ -49,9 +57,11 @@ BRAND_LOGO_URL = os.getenv(
     "DASHBOARD_LOGO_URL",
     "https://cdn.discordapp.com/attachments/1443222738750668952/1448482674477105362/image.png?ex=693b6c1d&is=693a1a9d&hm=ff31f492a74f0315498dee8ee26fa87b8512ddbee617f4bccda1161f59c8cb49&",
 )
+DASHBOARD_URL = os.getenv("DASHBOARD_URL", "https://jthweb.yugp.me:6767")
 MAX_CHANNELS = 500
 MAX_ROLES = 200
 STARTED_AT = discord.utils.utcnow()
+_RUNTIME_STR = f"Python {sys.version.split()[0]} | discord.py {discord.__version__}"
 RULES_DEFAULT = {
     "titleText": "Server Rules",
     "welcomeTitle": "Welcome!",
@@ -103,23 +113,52 @@ RULES_DEFAULT = {
     "footerText": None,
 }
 RULES_STATE: dict[int, dict] = {}
+# Bump when _sanitize_rules_config changes what it produces, so older sanitized dicts get redone.
+RULES_SANITIZED_VERSION = 1
+# guild_id -> merged + sanitized rules config, rebuilt only when _set_rules_config writes
+_RULES_CONFIG_CACHE: dict[int | None, dict] = {}
 CHAT_MINUTES_PER_MESSAGE = 1
-VOICE_SESSION_STARTS: dict[tuple[int, int], datetime] = {}
+VOICE_SESSION_STARTS: dict[tuple[int, int], tuple[float, str]] = {}
 STATS_EMBED_COLOR = 0x2F3136
 QUICKCHART_CREATE_URL = "https://quickchart.io/chart/create"
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=10)
+AVATAR_CACHE_SIZE = 512
+AVATAR_CACHE_TTL = 3600
+# avatar URL -> (loop time stored, data URI); avatar URLs embed the image hash, so a URL never changes content.
+_AVATAR_CACHE: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
 STAT_WINDOW_DAYS = 30
+_NOT_AUTHOR_MSG = "Only the user who opened this panel can use these buttons."
+_NOT_TEMPLATE_AUTHOR_MSG = "Only the user who generated this template can use these buttons."
+# Failed channel creates listed in the apply-template reply before summarizing the rest
+TEMPLATE_FAILURES_SHOWN = 10
 
 intents = discord.Intents.default()
 intents.guilds = True
 intents.members = True
 intents.messages = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+
+
+class ChannelManagerBot(commands.Bot):
+    async def close(self) -> None:
+        # Close the shared aiohttp session (see _get_http_session) before the gateway goes down
+        session = getattr(self, "_http_session", None)
+        if session is not None and not session.closed:
+            await session.close()
+        # Warnings are persisted in the background; don't lose the ones still queued
+        await flush_warning_writes()
+        await super().close()
+
+
+bot = ChannelManagerBot(command_prefix="!", intents=intents)
 bot.db = db
+# guild_id -> (verified_role_id, unverified_role_id), coerced to ints once per config change
+bot._verify: dict[int, tuple[int | None, int | None]] = {}
 
 
 async def process_pending_setups():
     """Background task to process pending setup requests from dashboard"""
-    await bot.wait_until_ready()
+    # Requests need bot.leveling and the other modules, which on_ready sets up after the gateway is ready
+    await bot._modules_ready.wait()
     
     while not bot.is_closed():
         try:
@@ -158,7 +197,7 @@ async def process_pending_setups():
                         from modules.leveling import create_leveling_roles, create_leveling_info_channel, create_rules_info_channel
                         
                         # Create roles
-                        await create_leveling_roles(guild, milestones, bot.leveling, bot)
+                        await create_leveling_roles(guild, milestones, bot.leveling, bot, sem=asyncio.Semaphore(5))
                         
                         # Create channels if requested
                         if create_info:
@@ -278,19 +317,43 @@ async def process_pending_setups():
         await asyncio.sleep(10)
 
 
+def _get_http_session() -> aiohttp.ClientSession:
+    session = getattr(bot, "_http_session", None)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=128, limit_per_host=64, ttl_dns_cache=300)
+        session = bot._http_session = aiohttp.ClientSession(connector=connector)
+    return session
+
+
+@bot.event
+async def setup_hook():
+    # Runs once per process, unlike on_ready which fires again on every reconnect.
+    _get_http_session()
+    bot._modules_ready = asyncio.Event()
+    if not getattr(bot, "_pending_task", None):
+        bot._pending_task = bot.loop.create_task(process_pending_setups())
+
+
 @bot.event
 async def on_ready():
+    print(f"Bot logged in as {bot.user}")
+    # on_disconnect stops the change logger, so restart it on every (re)connect
+    if not getattr(bot, "_change_observer", None):
+        bot._change_observer = start_change_logger(bot)
+    if getattr(bot, "_ready_once", False):
+        return
+    bot._ready_once = True
     try:
         await bot.tree.sync()
     except Exception:
         pass
-    print(f"Bot logged in as {bot.user}")
     
     # Store app info for owner checks
     bot._app_info = await bot.application_info()
     
-    bot._change_observer = start_change_logger(bot)
     init_verify_state(bot)
+    for guild in bot.guilds:
+        _refresh_verify_cache(guild.id)
     init_giveaway(bot)
     init_modmail(bot)
     init_reaction_roles(bot)
@@ -301,11 +364,9 @@ async def on_ready():
     setup_reaction_role_commands(bot)
     setup_moderation_commands(bot)
     setup_custom_command_commands(bot)
+    bot._modules_ready.set()
     await send_ticket_panel_to_channel(bot)
     
-    # Start background task for processing dashboard requests
-    bot.loop.create_task(process_pending_setups())
-    
     print("✅ All modules loaded successfully!")
     print(f"💰 Economy system enabled")
     print(f"📊 Leveling system enabled")
@@ -318,10 +379,12 @@ async def on_disconnect():
     observer = getattr(bot, "_change_observer", None)
     if observer:
         stop_change_logger(observer)
+        bot._change_observer = None
 
 
 @bot.event
 async def on_guild_join(guild: discord.Guild):
+    _refresh_verify_cache(guild.id)
     try:
         owner = guild.owner or await guild.fetch_owner()
         bot_name = bot.user.name if bot.user else "Channel Manager"
@@ -370,13 +433,7 @@ async def on_guild_join(guild: discord.Guild):
         )
         embed.set_footer(text="Channel Manager · CHECK `README.md` für Details + `FEATURES.md` für alle Systeme")
         view = discord.ui.View()
-        view.add_item(
-            discord.ui.Button(
-                label="Support Server",
-                style=discord.ButtonStyle.link,
-                url="https://discord.gg/zjr3Umcu",
-            )
-        )
+        view.add_item(_support_button())
         await owner.send(embed=embed, view=view)
     except Exception:
         return
@@ -401,13 +458,11 @@ async def on_message(message: discord.Message):
     if not message.guild or message.author.bot:
         return
     _record_message_activity(message)
-    config = get_verify_config(message.guild.id)
-    verify_role_id = config.get("verifiedRole")
-    unverified_role_id = config.get("unverifiedRole")
+    verify_role_id, _ = _get_verify_roles(message.guild.id)
     member = message.author if isinstance(message.author, discord.Member) else None
     if not member:
         return
-    if any(str(r.id) == str(verify_role_id) for r in member.roles):
+    if verify_role_id and member.get_role(verify_role_id):
         return
     bot_member = message.guild.me
     if not bot_member:
@@ -444,12 +499,29 @@ def _record_message_activity(message: discord.Message) -> None:
         return
 
 
+def _coerce_role_id(value: Any) -> int | None:
+    return int(value) if value and str(value).isdigit() else None
+
+
+def _refresh_verify_cache(guild_id: int) -> tuple[int | None, int | None]:
+    config = get_verify_config_view(guild_id)
+    roles = (_coerce_role_id(config.get("verifiedRole")), _coerce_role_id(config.get("unverifiedRole")))
+    bot._verify[guild_id] = roles
+    return roles
+
+
+def _get_verify_roles(guild_id: int) -> tuple[int | None, int | None]:
+    roles = bot._verify.get(guild_id)
+    if roles is None:
+        roles = _refresh_verify_cache(guild_id)
+    return roles
+
+
 @bot.event
 async def on_member_join(member: discord.Member):
-    config = get_verify_config(member.guild.id)
-    unverified_role_id = config.get("unverifiedRole")
-    if unverified_role_id and str(unverified_role_id).isdigit():
-        role = member.guild.get_role(int(unverified_role_id))
+    _, unverified_role_id = _get_verify_roles(member.guild.id)
+    if unverified_role_id:
+        role = member.guild.get_role(unverified_role_id)
         if role:
             try:
                 await member.add_roles(role, reason="Auto assign unverified role on join")
@@ -457,16 +529,16 @@ async def on_member_join(member: discord.Member):
                 pass
 
 
-def _commit_voice_session(guild_id: int, user_id: int, start: datetime, end: datetime) -> None:
-    duration = (end - start).total_seconds()
+def _commit_voice_session(guild_id: int, user_id: int, start: float, end: float, activity_date: str) -> None:
+    duration = end - start
     if duration <= 0:
         return
-    minutes = max(1, math.ceil(duration / 60))
+    minutes = max(1, int((duration + 59.999) // 60))
     db.record_user_activity(
         guild_id,
         user_id,
         voice_minutes=minutes,
-        activity_date=start.date().isoformat(),
+        activity_date=activity_date,
     )
 
 
@@ -478,28 +550,55 @@ async def on_voice_state_update(member: discord.Member, before: discord.VoiceSta
     if not guild:
         return
     key = (guild.id, member.id)
-    now = discord.utils.utcnow()
+    # Monotonic loop time for durations; the session is attributed to the day it started.
+    now = bot.loop.time()
     before_channel = before.channel
     after_channel = after.channel
     if before_channel is None and after_channel is not None:
-        VOICE_SESSION_STARTS[key] = now
+        VOICE_SESSION_STARTS[key] = (now, discord.utils.utcnow().date().isoformat())
         return
     if before_channel is not None and after_channel is None:
-        start = VOICE_SESSION_STARTS.pop(key, None)
-        if start:
-            _commit_voice_session(guild.id, member.id, start, now)
+        session = VOICE_SESSION_STARTS.pop(key, None)
+        if session:
+            _commit_voice_session(guild.id, member.id, session[0], now, session[1])
         return
     if before_channel and after_channel and before_channel.id != after_channel.id:
-        start = VOICE_SESSION_STARTS.pop(key, None)
-        if start:
-            _commit_voice_session(guild.id, member.id, start, now)
-        VOICE_SESSION_STARTS[key] = now
+        session = VOICE_SESSION_STARTS.pop(key, None)
+        if session:
+            _commit_voice_session(guild.id, member.id, session[0], now, session[1])
+        VOICE_SESSION_STARTS[key] = (now, discord.utils.utcnow().date().isoformat())
 
 
 # helper used by rule commands
+ADMIN_CHECK_TTL = 30
+ADMIN_CACHE_SIZE = 2048
+# (guild_id, user_id) -> (loop time checked, allowed), least recently used first
+_ADMIN_CACHE: "OrderedDict[tuple[int, int], tuple[float, bool]]" = OrderedDict()
+
+
 async def _is_owner_or_admin(interaction: discord.Interaction) -> bool:
     if not interaction.guild:
         return False
+    key = (interaction.guild.id, interaction.user.id)
+    now = bot.loop.time()
+    entry = _ADMIN_CACHE.get(key)
+    if entry and now - entry[0] < ADMIN_CHECK_TTL:
+        _ADMIN_CACHE.move_to_end(key)
+        return entry[1]
+    allowed = await _check_owner_or_admin(interaction)
+    _ADMIN_CACHE[key] = (now, allowed)
+    _ADMIN_CACHE.move_to_end(key)
+    while len(_ADMIN_CACHE) > ADMIN_CACHE_SIZE:
+        _ADMIN_CACHE.popitem(last=False)
+    return allowed
+
+
+def _forget_admin_checks(guild_id: int) -> None:
+    for key in [key for key in _ADMIN_CACHE if key[0] == guild_id]:
+        del _ADMIN_CACHE[key]
+
+
+async def _check_owner_or_admin(interaction: discord.Interaction) -> bool:
     owner_id = interaction.guild.owner_id
     if not owner_id:
         try:
@@ -521,6 +620,28 @@ async def _is_owner_or_admin(interaction: discord.Interaction) -> bool:
     return False
 
 
+@bot.event
+async def on_member_update(before: discord.Member, after: discord.Member):
+    _ADMIN_CACHE.pop((after.guild.id, after.id), None)
+
+
+@bot.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    _forget_admin_checks(after.guild.id)
+
+
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    _forget_admin_checks(role.guild.id)
+
+
+@bot.event
+async def on_guild_update(before: discord.Guild, after: discord.Guild):
+    # Ownership transfer changes who passes the owner check
+    if before.owner_id != after.owner_id:
+        _forget_admin_checks(after.id)
+
+
 class RulesView(discord.ui.View):
     def __init__(self, config: dict):
         super().__init__(timeout=None)
@@ -740,7 +861,32 @@ SETUP_COMMAND_GROUPS = {
 
 
 def _format_command_list(command_pairs):
-    return "\n".join(f"- `{name}` — {desc}" for name, desc in command_pairs)
+    fmt = "- `{}` — {}".format
+    return "\n".join([fmt(name, desc) for name, desc in command_pairs])
+
+
+# SETUP_COMMAND_GROUPS is static, so the formatted command lists are built once at import.
+_GROUP_FORMATTED = {
+    key: sys.intern(_format_command_list(group["commands"])) for key, group in SETUP_COMMAND_GROUPS.items()
+}
+_ALL_COMMANDS_FIELDS = tuple(
+    (f"{group['emoji']} {group['label']}", _GROUP_FORMATTED[key]) for key, group in SETUP_COMMAND_GROUPS.items()
+)
+# Same pairs in discord.Embed's internal field format, assigned in one go instead of N add_field calls.
+_ALL_COMMANDS_EMBED_FIELDS = tuple({"name": name, "value": value, "inline": False} for name, value in _ALL_COMMANDS_FIELDS)
+
+
+# (custom_id, label, row, group key) for the per-module buttons on the /setup panel.
+_SETUP_GROUP_BUTTONS = (
+    ("setup_cmd_server", "Server Setup", 0, "server"),
+    ("setup_cmd_moderation", "Moderation", 0, "moderation"),
+    ("setup_cmd_verify", "Verify & Rules", 0, "verification"),
+    ("setup_cmd_giveaways", "Giveaways", 0, "giveaways"),
+    ("setup_cmd_tickets", "Tickets & Modmail", 1, "tickets"),
+    ("setup_cmd_custom", "Custom Cmds & Roles", 1, "custom_roles"),
+    ("setup_cmd_logging", "Logging & Extras", 1, "logging"),
+)
+_SETUP_GROUP_BY_CUSTOM_ID = {custom_id: group_key for custom_id, _, _, group_key in _SETUP_GROUP_BUTTONS}
 
 
 class SetupModulesActionView(discord.ui.View):
@@ -749,12 +895,14 @@ class SetupModulesActionView(discord.ui.View):
     def __init__(self, author_id: int):
         super().__init__(timeout=240)
         self.author_id = author_id
+        for custom_id, label, row, _ in _SETUP_GROUP_BUTTONS:
+            button = discord.ui.Button(label=label, style=discord.ButtonStyle.secondary, row=row, custom_id=custom_id)
+            button.callback = self._group_button_callback
+            self.add_item(button)
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id != self.author_id:
-            await interaction.response.send_message(
-                "Only the user who opened this panel can use these buttons.", ephemeral=True
-            )
+            await interaction.response.send_message(_NOT_AUTHOR_MSG, ephemeral=True)
             return False
         return True
 
@@ -765,78 +913,49 @@ class SetupModulesActionView(discord.ui.View):
             description=group["description"],
             color=EMBED_COLOR,
         )
-        embed.add_field(name="Commands", value=_format_command_list(group["commands"]), inline=False)
+        embed.add_field(name="Commands", value=_GROUP_FORMATTED[group_key], inline=False)
         embed.set_footer(text="Run these slash commands directly in Discord to configure the module.")
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    async def _group_button_callback(self, interaction: discord.Interaction):
+        custom_id = (interaction.data or {}).get("custom_id")
+        await self._send_group_embed(interaction, _SETUP_GROUP_BY_CUSTOM_ID[custom_id])
+
     async def _send_all_commands(self, interaction: discord.Interaction):
         embed = discord.Embed(
             title="Full Command Reference",
             description="Every major Channel Manager slash command grouped by module.",
             color=EMBED_COLOR,
         )
-        for group in SETUP_COMMAND_GROUPS.values():
-            embed.add_field(
-                name=f"{group['emoji']} {group['label']}",
-                value=_format_command_list(group["commands"]),
-                inline=False,
-            )
+        embed._fields = list(_ALL_COMMANDS_EMBED_FIELDS)
         embed.set_footer(text="Use /help for text import snippets any time.")
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    @discord.ui.button(label="Server Setup", style=discord.ButtonStyle.secondary, custom_id="setup_cmd_server")
-    async def server_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self._send_group_embed(interaction, "server")
-
-    @discord.ui.button(label="Moderation", style=discord.ButtonStyle.secondary, custom_id="setup_cmd_moderation")
-    async def moderation_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self._send_group_embed(interaction, "moderation")
+    @discord.ui.button(label="All Commands", style=discord.ButtonStyle.success, row=2, custom_id="setup_cmd_all")
+    async def all_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._send_all_commands(interaction)
 
-    @discord.ui.button(label="Verify & Rules", style=discord.ButtonStyle.secondary, custom_id="setup_cmd_verify")
-    async def verification_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self._send_group_embed(interaction, "verification")
 
-    @discord.ui.button(label="Giveaways", style=discord.ButtonStyle.secondary, custom_id="setup_cmd_giveaways")
-    async def giveaways_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self._send_group_embed(interaction, "giveaways")
+SUPPORT_SERVER_URL = "https://discord.gg/zjr3Umcu"
 
-    @discord.ui.button(label="Tickets & Modmail", style=discord.ButtonStyle.secondary, row=1, custom_id="setup_cmd_tickets")
-    async def tickets_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self._send_group_embed(interaction, "tickets")
 
-    @discord.ui.button(label="Custom Cmds & Roles", style=discord.ButtonStyle.secondary, row=1, custom_id="setup_cmd_custom")
-    async def custom_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self._send_group_embed(interaction, "custom_roles")
+# View.add_item binds the item to that view, so every view gets its own button instances.
+def _dashboard_button() -> discord.ui.Button:
+    return discord.ui.Button(label="Open Dashboard", style=discord.ButtonStyle.link, url=DASHBOARD_URL)
 
-    @discord.ui.button(label="Logging & Extras", style=discord.ButtonStyle.secondary, row=1, custom_id="setup_cmd_logging")
-    async def logging_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self._send_group_embed(interaction, "logging")
 
-    @discord.ui.button(label="All Commands", style=discord.ButtonStyle.success, row=2, custom_id="setup_cmd_all")
-    async def all_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self._send_all_commands(interaction)
+def _support_button() -> discord.ui.Button:
+    return discord.ui.Button(label="Support Server", style=discord.ButtonStyle.link, url=SUPPORT_SERVER_URL)
 
 
 class SetupDashboardView(discord.ui.View):
     """Buttons for the /setup_dashboard command."""
 
-    def __init__(self, dashboard_url: str, author_id: int):
+    def __init__(self, author_id: int):
         super().__init__(timeout=180)
         self.author_id = author_id
-        self.add_item(
-            discord.ui.Button(
-                label="Open Dashboard",
-                style=discord.ButtonStyle.link,
-                url=dashboard_url,
-            )
-        )
-        self.add_item(
-            discord.ui.Button(
-                label="Support Server",
-                style=discord.ButtonStyle.link,
-                url="https://discord.gg/zjr3Umcu",
-            )
-        )
+        self.add_item(_dashboard_button())
+        self.add_item(_support_button())
 
     @discord.ui.button(label="/setup", style=discord.ButtonStyle.primary, custom_id="setup_dashboard_modules")
     async def modules_button(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -852,7 +971,7 @@ class SetupDashboardView(discord.ui.View):
         )
 
 
-def _build_setup_modules_embed() -> discord.Embed:
+def _make_setup_modules_embed() -> discord.Embed:
     embed = discord.Embed(
         title="Setup Modules Overview",
         description=(
@@ -902,6 +1021,13 @@ def _build_setup_modules_embed() -> discord.Embed:
     return embed
 
 
+_SETUP_MODULES_EMBED = _make_setup_modules_embed()
+
+
+def _build_setup_modules_embed() -> discord.Embed:
+    return _SETUP_MODULES_EMBED.copy()
+
+
 class ChannelSetupView(discord.ui.View):
     """Buttons for parsing text layouts or analyzing screenshots."""
 
@@ -911,9 +1037,7 @@ class ChannelSetupView(discord.ui.View):
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id != self.author_id:
-            await interaction.response.send_message(
-                "Only the user who opened this panel can use these buttons.", ephemeral=True
-            )
+            await interaction.response.send_message(_NOT_AUTHOR_MSG, ephemeral=True)
             return False
         return True
 
@@ -970,11 +1094,22 @@ class ChannelImageAnalyzeModal(discord.ui.Modal, title="Analyze Channel Screensh
         await _send_template_preview(interaction, "Image Analyzer", template)
 
 
+def _template_counts(template: Dict[str, Any]) -> tuple[int, int]:
+    """Return (categories, channels), using the totals stored by the parsers when present."""
+    cat_count = template.get("_category_count")
+    channel_count = template.get("_channel_count")
+    if cat_count is None or channel_count is None:
+        categories = template.get("categories") or ()
+        cat_count = template["_category_count"] = len(categories)
+        channel_count = template["_channel_count"] = sum(len(cat.get("channels") or ()) for cat in categories)
+    return cat_count, channel_count
+
+
 def _build_template_preview_embed(source_label: str, template: Dict[str, Any]) -> discord.Embed:
     categories = template.get("categories") or []
     roles = template.get("roles") or []
-    total_channels = sum(len(cat.get("channels", [])) for cat in categories)
-    summary_text = template.get("summary") or f"{len(categories)} categories / {total_channels} channels"
+    cat_count, total_channels = _template_counts(template)
+    summary_text = template.get("summary") or f"{cat_count} categories / {total_channels} channels"
     embed = discord.Embed(
         title=f"{source_label} Result",
         description=summary_text,
@@ -994,7 +1129,7 @@ def _build_template_preview_embed(source_label: str, template: Dict[str, Any]) -
     return embed
 
 
-def _build_channel_setup_intro_embed() -> discord.Embed:
+def _make_channel_setup_intro_embed() -> discord.Embed:
     embed = discord.Embed(
         title="Channel Setup Wizard",
         description=(
@@ -1017,6 +1152,13 @@ def _build_channel_setup_intro_embed() -> discord.Embed:
     return embed
 
 
+_CHANNEL_SETUP_INTRO_EMBED = _make_channel_setup_intro_embed()
+
+
+def _build_channel_setup_intro_embed() -> discord.Embed:
+    return _CHANNEL_SETUP_INTRO_EMBED.copy()
+
+
 class ChannelTemplateActionView(discord.ui.View):
     """Actions available after parsing channel templates."""
 
@@ -1029,9 +1171,7 @@ class ChannelTemplateActionView(discord.ui.View):
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id != self.author_id:
-            await interaction.response.send_message(
-                "Only the user who generated this template can use these buttons.", ephemeral=True
-            )
+            await interaction.response.send_message(_NOT_TEMPLATE_AUTHOR_MSG, ephemeral=True)
             return False
         return True
 
@@ -1050,20 +1190,29 @@ class ChannelTemplateActionView(discord.ui.View):
             await interaction.response.send_message("Only the server owner or admins can apply templates.", ephemeral=True)
             return
 
+        template = self.template
         await interaction.response.defer(ephemeral=True, thinking=True)
         try:
-            await build_server_from_template(interaction.guild, self.template)
+            role_failures, channel_failures = await build_server_from_template(interaction.guild, template)
         except Exception as error:
             await interaction.followup.send(f"Failed to build template: {error}", ephemeral=True)
             return
 
-        cat_count = len(self.template.get("categories") or [])
-        channel_count = sum(len(cat.get("channels", [])) for cat in self.template.get("categories", []))
-        await interaction.followup.send(
-            f"✅ Applied **{cat_count}** categories / **{channel_count}** channels from {self.source_label}. "
-            "Use the dashboard if you need to fine-tune ordering or roles.",
-            ephemeral=True,
+        cat_count, channel_count = _template_counts(template)
+        message = (
+            f"✅ Applied **{cat_count}** categories / **{channel_count - len(channel_failures)}** channels from {self.source_label}. "
+            "Use the dashboard if you need to fine-tune ordering or roles."
         )
+        failures = role_failures + channel_failures
+        if failures:
+            lines = [
+                f"• {category} / {channel}: {error.text or error.status}"
+                for category, channel, error in failures[:TEMPLATE_FAILURES_SHOWN]
+            ]
+            if len(failures) > TEMPLATE_FAILURES_SHOWN:
+                lines.append(f"… and {len(failures) - TEMPLATE_FAILURES_SHOWN} more")
+            message += f"\n⚠️ **{len(failures)}** template steps failed:\n" + "\n".join(lines)
+        await interaction.followup.send(message[:2000], ephemeral=True)
 
 
 async def _send_template_preview(
@@ -1074,14 +1223,7 @@ async def _send_template_preview(
     await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
 
-@bot.tree.command(name="setup_dashboard", description="Load a prebuilt server template (customize via dashboard).")
-async def setup_dashboard_command(interaction: discord.Interaction):
-    if not await _is_owner_or_admin(interaction):
-        await interaction.response.send_message("Only the server owner or admins can use this command.", ephemeral=True)
-        return
-    
-    dashboard_url = os.getenv("DASHBOARD_URL", "https://jthweb.yugp.me:6767")
-    
+def _make_setup_dashboard_embed() -> discord.Embed:
     embed = discord.Embed(
         title="Setup Dashboard",
         description=(
@@ -1125,10 +1267,21 @@ async def setup_dashboard_command(interaction: discord.Interaction):
         inline=False,
     )
     embed.set_footer(text="All bot customization happens via the web dashboard")
+    return embed
+
+
+_SETUP_DASHBOARD_EMBED = _make_setup_dashboard_embed()
+
+
+@bot.tree.command(name="setup_dashboard", description="Load a prebuilt server template (customize via dashboard).")
+async def setup_dashboard_command(interaction: discord.Interaction):
+    if not await _is_owner_or_admin(interaction):
+        await interaction.response.send_message("Only the server owner or admins can use this command.", ephemeral=True)
+        return
     
-    view = SetupDashboardView(dashboard_url, interaction.user.id)
+    view = SetupDashboardView(interaction.user.id)
     
-    await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+    await interaction.response.send_message(embed=_SETUP_DASHBOARD_EMBED.copy(), view=view, ephemeral=True)
 
 
 @bot.tree.command(name="setup", description="Show the in-Discord setup panel with module buttons.")
@@ -1173,14 +1326,14 @@ async def health_command(interaction: discord.Interaction):
     status = getattr(bot, "status", discord.Status.online).name
     ping = max(0, round(bot.latency * 1000)) if hasattr(bot, "latency") else 0
     guild_count = len(bot.guilds)
-    channel_count = sum(len(guild.channels) for guild in bot.guilds)
-    uptime_seconds = int((discord.utils.utcnow() - STARTED_AT).total_seconds())
-    uptime_parts = (
-        f"{uptime_seconds // 86400}d "
-        f"{(uptime_seconds % 86400) // 3600}h "
-        f"{(uptime_seconds % 3600) // 60}m "
-        f"{uptime_seconds % 60}s"
-    )
+    # Guild.channels builds a fresh list per guild; the backing dict gives the same count for free.
+    channel_count = sum(len(guild._channels) for guild in bot.guilds)
+    now = discord.utils.utcnow()
+    uptime_seconds = int((now - STARTED_AT).total_seconds())
+    days, rem = divmod(uptime_seconds, 86400)
+    hours, rem = divmod(rem, 3600)
+    minutes, seconds = divmod(rem, 60)
+    uptime_parts = f"{days}d {hours}h {minutes}m {seconds}s"
 
     embed = discord.Embed(title="Channel Manager Health", color=EMBED_COLOR)
     embed.set_thumbnail(url=EMBED_THUMB)
@@ -1189,15 +1342,14 @@ async def health_command(interaction: discord.Interaction):
     embed.add_field(name="Uptime", value=uptime_parts, inline=True)
     embed.add_field(name="Servers", value=str(guild_count), inline=True)
     embed.add_field(name="Channels (cached)", value=str(channel_count), inline=True)
-    embed.add_field(name="Runtime", value=f"Python {sys.version.split()[0]} | discord.py {discord.__version__}", inline=False)
+    embed.add_field(name="Runtime", value=_RUNTIME_STR, inline=False)
     embed.set_footer(text="Channel Manager - system health")
-    embed.timestamp = discord.utils.utcnow()
+    embed.timestamp = now
 
     await _safe_send(interaction, embed=embed, ephemeral=True)
 
 
-@bot.tree.command(name="help", description="Show a short help message.")
-async def help_command(interaction: discord.Interaction):
+def _build_help_embed() -> discord.Embed:
     channel_example = (
         "INFORMATION (category)\n"
         "  #announcements\n"
@@ -1251,14 +1403,18 @@ async def help_command(interaction: discord.Interaction):
             "- Use `/channel_setup` to parse text or screenshot layouts and apply them instantly.",
         ]
     )
-    for group in SETUP_COMMAND_GROUPS.values():
-        embed.add_field(
-            name=f"{group['emoji']} {group['label']}",
-            value=_format_command_list(group["commands"]),
-            inline=False,
-        )
+    embed._fields = list(_ALL_COMMANDS_EMBED_FIELDS)
     embed.set_footer(text="Channel Manager - simple help")
-    await _safe_send(interaction, embed=embed, ephemeral=True)
+    return embed
+
+
+_HELP_EMBED = _build_help_embed()
+
+
+@bot.tree.command(name="help", description="Show a short help message.")
+async def help_command(interaction: discord.Interaction):
+    # Sending only serializes the embed, so the shared instance never needs copying.
+    await _safe_send(interaction, embed=_HELP_EMBED, ephemeral=True)
 
 
 @bot.tree.command(name="rules", description="Show server rules with a selector.")
@@ -1353,6 +1509,7 @@ class VerifySetupModal(discord.ui.Modal, title="Verify Setup"):
             }
         )
         update_verify_config(interaction.guild_id, config)
+        _refresh_verify_cache(interaction.guild_id)
         preview = build_verify_embed(config)
         await interaction.response.send_message("Verify settings saved. Preview below.", embed=preview, ephemeral=True)
 
@@ -1461,7 +1618,7 @@ async def verify_command(interaction: discord.Interaction):
     if not interaction.guild:
         await interaction.response.send_message("Use this in a server.", ephemeral=True)
         return
-    config = get_verify_config(interaction.guild_id)
+    config = get_verify_config_view(interaction.guild_id)
     embed = build_verify_embed(config)
     view = discord.ui.View(timeout=None)
     view.add_item(discord.ui.Button(custom_id="verify-accept", style=discord.ButtonStyle.success, label="Verify"))
@@ -1529,13 +1686,18 @@ async def delete_channels_command(interaction: discord.Interaction):
     if not bot_member:
         await interaction.followup.send("Bot member not found in guild.", ephemeral=True)
         return
-    channels = await interaction.guild.fetch_channels()
-    delete_tasks = []
-    for ch in channels:
-        if getattr(ch, "permissions_for", None) and ch.permissions_for(bot_member).manage_channels:
-            delete_tasks.append(ch.delete(reason="Requested by /delete_channel"))
-    await asyncio.gather(*delete_tasks, return_exceptions=True)
-    await interaction.followup.send(f"Delete finished. Channels/categories removed: {len(delete_tasks)}.", ephemeral=True)
+    channels = interaction.guild.channels
+    deletable = [
+        ch
+        for ch in channels
+        if getattr(ch, "permissions_for", None) and ch.permissions_for(bot_member).manage_channels
+    ]
+    # Children first, so deleting a category never has to cascade over channels still inside it.
+    categories = [ch for ch in deletable if isinstance(ch, discord.CategoryChannel)]
+    others = [ch for ch in deletable if not isinstance(ch, discord.CategoryChannel)]
+    await _bounded_gather([ch.delete(reason="Requested by /delete_channel") for ch in others], limit=5)
+    await _bounded_gather([ch.delete(reason="Requested by /delete_channel") for ch in categories], limit=5)
+    await interaction.followup.send(f"Delete finished. Channels/categories removed: {len(deletable)}.", ephemeral=True)
 
 
 @bot.tree.command(name="delete_roles", description="Delete all deletable roles (except @everyone/managed/above bot).")
@@ -1551,17 +1713,14 @@ async def delete_roles_command(interaction: discord.Interaction):
     me = interaction.guild.me or await interaction.guild.fetch_member(bot.user.id)
     my_top_pos = me.top_role.position if me else 0
 
-    roles = await interaction.guild.fetch_roles()
-    delete_tasks = []
-    for role in roles:
-        if role.id == interaction.guild.default_role.id:
-            continue
-        if role.managed:
-            continue
-        if role.position >= my_top_pos:
-            continue
-        delete_tasks.append(role.delete(reason="Requested by /delete_roles"))
-    await asyncio.gather(*delete_tasks, return_exceptions=True)
+    roles = interaction.guild.roles
+    default_id = interaction.guild.default_role.id
+    delete_tasks = [
+        role.delete(reason="Requested by /delete_roles")
+        for role in roles
+        if role.id != default_id and not role.managed and role.position < my_top_pos
+    ]
+    await _bounded_gather(delete_tasks, limit=5)
     await interaction.followup.send(f"Delete finished. Roles removed: {len(delete_tasks)}.", ephemeral=True)
 
 
@@ -1569,25 +1728,184 @@ async def delete_roles_command(interaction: discord.Interaction):
 def _ensure_template_safe(template: Any) -> None:
     if not template or not isinstance(template, dict) or not isinstance(template.get("categories"), list):
         raise ValueError("Template is not valid.")
-    channel_count = sum(len(cat.get("channels", [])) for cat in template.get("categories", []))
+    channel_count = 0
+    for cat in template["categories"]:
+        channel_count += len(cat.get("channels") or [])
+        if channel_count > MAX_CHANNELS:
+            raise ValueError(f"Too many channels ({channel_count}+). Discord limit is around 500.")
     role_count = len(template.get("roles", [])) if isinstance(template.get("roles"), list) else 0
-    if channel_count > MAX_CHANNELS:
-        raise ValueError(f"Too many channels ({channel_count}). Discord limit is around 500.")
     if role_count > MAX_ROLES:
         raise ValueError(f"Too many roles ({role_count}).")
 
 
+def _json_dumps(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj)
+
+
+_STATS_HEADER_PLACEHOLDER = "__stats_header__"
+_STATS_CHART_OPTIONS = {
+    "responsive": True,
+    "maintainAspectRatio": False,
+    "interaction": {"mode": "index", "intersect": False},
+    "layout": {"padding": {"top": 170, "left": 40, "right": 40, "bottom": 40}},
+    "scales": {
+        "x": {
+            "grid": {"color": "rgba(0,0,0,0.05)"},
+            "ticks": {"color": "#333333", "maxRotation": 0, "minRotation": 0},
+        },
+        "y": {
+            "grid": {"color": "rgba(0,0,0,0.05)"},
+            "ticks": {"color": "#333333"},
+        },
+    },
+    "plugins": {
+        "legend": {
+            "position": "bottom",
+            "labels": {"color": "#333333", "boxWidth": 12, "usePointStyle": True},
+        },
+        "statsHeader": _STATS_HEADER_PLACEHOLDER,
+    },
+}
+# Only plugins.statsHeader varies per call: serialize the rest once and splice the header JSON in.
+_STATS_OPTIONS_JSON_HEAD, _STATS_OPTIONS_JSON_TAIL = _json_dumps(_STATS_CHART_OPTIONS).split(
+    _json_dumps(_STATS_HEADER_PLACEHOLDER)
+)
+_STATS_DATA_PLACEHOLDER = "__stats_data__"
+
+
+def _stats_dataset_json(label: str, color: str) -> tuple[str, str]:
+    dataset = {
+        "label": label,
+        "borderColor": color,
+        "backgroundColor": color,
+        "borderWidth": 3,
+        "tension": 0.3,
+        "pointRadius": 3,
+        "pointBackgroundColor": color,
+        "data": _STATS_DATA_PLACEHOLDER,
+        "fill": False,
+        "spanGaps": True,
+    }
+    head, tail = _json_dumps(dataset).split(_json_dumps(_STATS_DATA_PLACEHOLDER))
+    return head, tail
+
+
+# Dataset styling is fixed; only the data arrays change, so each dataset is pre-encoded around them.
+_STATS_CHAT_DATASET = _stats_dataset_json("Chat Minutes", "#3498db")
+_STATS_VOICE_DATASET = _stats_dataset_json("Voice Minutes", "#2ecc71")
+# Chart.js plugin drawing the avatar + summary header; static, so it is built once per process.
+_STATS_HEADER_PLUGIN: Final[str] = (
+    '{'
+    '"id":"statsHeader",'
+    '"beforeDraw":function(chart){'
+    "const ctx=chart.ctx;"
+    "const opts=chart.config.options.plugins.statsHeader||{};"
+    "const width=chart.width;"
+    "const height=chart.height;"
+    "ctx.save();"
+    "ctx.fillStyle='white';"
+    "ctx.fillRect(0,0,width,height);"
+    "const drawAvatar=function(img){"
+    "const centerX=40+35;"
+    "const centerY=35+35;"
+    "const radius=35;"
+    "ctx.save();"
+    "ctx.beginPath();"
+    "ctx.arc(centerX,centerY,radius,0,Math.PI*2);"
+    "ctx.closePath();"
+    "ctx.clip();"
+    "ctx.drawImage(img,40,35,radius*2,radius*2);"
+    "ctx.restore();"
+    "ctx.save();"
+    "ctx.beginPath();"
+    "ctx.arc(centerX,centerY,radius,0,Math.PI*2);"
+    "ctx.lineWidth=2;"
+    "ctx.strokeStyle='#ddd';"
+    "ctx.stroke();"
+    "ctx.restore();"
+    "};"
+    "let avatarDrawn=false;"
+    "const renderAvatar=function(img){"
+    "if(avatarDrawn)return;"
+    "avatarDrawn=true;"
+    "drawAvatar(img);"
+    "};"
+    "const drawHeader=function(){"
+    "ctx.save();"
+    "ctx.font='bold 26px Sans-serif';"
+    "ctx.fillStyle='#000';"
+    "ctx.textBaseline='middle';"
+    "ctx.fillText(opts.username||'',100,50);"
+    "ctx.font='16px Sans-serif';"
+    "ctx.fillStyle='#555';"
+    "const avgChat=parseFloat(opts.avgChat)||0;"
+    "const avgVoice=parseFloat(opts.avgVoice)||0;"
+    "ctx.fillText('Today\\'s Activity — Chat '+(opts.todayChat||0)+' min, Voice '+(opts.todayVoice||0)+' min',100,85);"
+    "ctx.fillText('30-Day Average — Chat '+avgChat.toFixed(1)+' min, Voice '+avgVoice.toFixed(1)+' min',100,115);"
+    "ctx.restore();"
+    "};"
+    "ctx.save();"
+    "ctx.strokeStyle='#ddd';"
+    "ctx.lineWidth=1;"
+    "ctx.beginPath();"
+    "ctx.moveTo(0,150);"
+    "ctx.lineTo(width,150);"
+    "ctx.stroke();"
+    "ctx.restore();"
+    "let headerDrawn=false;"
+    "const renderHeader=function(){"
+    "if(headerDrawn)return;"
+    "headerDrawn=true;"
+    "drawHeader();"
+    "};"
+    "if(opts.avatarData){"
+    "const img=new Image();"
+    "img.onload=function(){"
+    "renderAvatar(img);"
+    "renderHeader();"
+    "};"
+    "img.src=opts.avatarData;"
+    "if(img.complete){"
+    "renderAvatar(img);"
+    "renderHeader();"
+    "}"
+    "}else{"
+    "renderHeader();"
+    "}"
+    "ctx.restore();"
+    "}"
+    "}"
+)
+# The plugin is a JS function, so the chart config is assembled as text rather than through a JSON encoder.
+_STATS_CHART_SKELETON = '{"type":"line","data":%s,"options":%s,"plugins":[%s]}'
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _encode_data_uri(content_type: str, data: bytes) -> str:
+    return f"data:{content_type};base64," + base64.b64encode(data).decode("ascii")
+
+
 async def _fetch_avatar_data(url: str) -> str | None:
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url, timeout=10) as resp:
-                resp.raise_for_status()
-                data = await resp.read()
-                content_type = resp.headers.get("Content-Type", "image/png")
-        except Exception:  # pragma: no cover
-            return None
-    encoded = base64.b64encode(data).decode("ascii")
-    return f"data:{content_type};base64,{encoded}"
+    now = bot.loop.time()
+    cached = _AVATAR_CACHE.get(url)
+    if cached and now - cached[0] < AVATAR_CACHE_TTL:
+        _AVATAR_CACHE.move_to_end(url)
+        return cached[1]
+    try:
+        async with _get_http_session().get(url, timeout=HTTP_TIMEOUT) as resp:
+            resp.raise_for_status()
+            data = await resp.read()
+            content_type = resp.headers.get("Content-Type", "image/png")
+    except Exception:  # pragma: no cover
+        return None
+    data_uri = await asyncio.to_thread(_encode_data_uri, content_type, data)
+    _AVATAR_CACHE[url] = (now, data_uri)
+    _AVATAR_CACHE.move_to_end(url)
+    while len(_AVATAR_CACHE) > AVATAR_CACHE_SIZE:
+        _AVATAR_CACHE.popitem(last=False)
+    return data_uri
 
 
 @bot.tree.command(name="stats", description="Show recent chat and voice activity.")
@@ -1618,182 +1936,40 @@ async def stats_command(
         await _safe_send(interaction, content="No activity data found for this user.", ephemeral=True)
         return
 
-    activity_map = {
-        row["activity_date"]: (
-            int(row.get("chat_minutes") or 0),
-            int(row.get("voice_minutes") or 0),
-        )
-        for row in summary_rows
-    }
-    chat_values: list[int] = []
-    voice_values: list[int] = []
-    for single_day in date_series:
-        iso_day = single_day.isoformat()
-        chat, voice = activity_map.get(iso_day, (0, 0))
-        chat_values.append(chat)
-        voice_values.append(voice)
-
-    total_days = len(chat_values) or 1
+    labels = [day.isoformat() for day in date_series]
+    chat_values = [0] * window_days
+    voice_values = [0] * window_days
+    # Rows are already one per day, so scatter them straight into the series by day offset.
+    for row in summary_rows:
+        index = (date.fromisoformat(row["activity_date"]) - start_date).days
+        if 0 <= index < window_days:
+            chat_values[index] = int(row.get("chat_minutes") or 0)
+            voice_values[index] = int(row.get("voice_minutes") or 0)
+
     today_chat = chat_values[-1]
     today_voice = voice_values[-1]
-    avg_chat = sum(chat_values) / total_days
-    avg_voice = sum(voice_values) / total_days
-    labels = [day.isoformat() for day in date_series]
+    avg_chat = sum(chat_values) / window_days
+    avg_voice = sum(voice_values) / window_days
 
-    chart_data = {
-        "labels": labels,
-        "datasets": [
-            {
-                "label": "Chat Minutes",
-                "borderColor": "#3498db",
-                "backgroundColor": "#3498db",
-                "borderWidth": 3,
-                "tension": 0.3,
-                "pointRadius": 3,
-                "pointBackgroundColor": "#3498db",
-                "data": chat_values,
-                "fill": False,
-                "spanGaps": True,
-            },
-            {
-                "label": "Voice Minutes",
-                "borderColor": "#2ecc71",
-                "backgroundColor": "#2ecc71",
-                "borderWidth": 3,
-                "tension": 0.3,
-                "pointRadius": 3,
-                "pointBackgroundColor": "#2ecc71",
-                "data": voice_values,
-                "fill": False,
-                "spanGaps": True,
-            },
-        ],
-    }
+    chart_data_json = '{"labels":%s,"datasets":[%s,%s]}' % (
+        _json_dumps(labels),
+        _STATS_CHAT_DATASET[0] + _json_dumps(chat_values) + _STATS_CHAT_DATASET[1],
+        _STATS_VOICE_DATASET[0] + _json_dumps(voice_values) + _STATS_VOICE_DATASET[1],
+    )
 
     avatar = getattr(getattr(target, "display_avatar", target.avatar), "url", None)
     avatar_data = await _fetch_avatar_data(avatar) if avatar else None
 
-    header_plugin = (
-        '{'
-        '"id":"statsHeader",'
-        '"beforeDraw":function(chart){'
-        "const ctx=chart.ctx;"
-        "const opts=chart.config.options.plugins.statsHeader||{};"
-        "const width=chart.width;"
-        "const height=chart.height;"
-        "ctx.save();"
-        "ctx.fillStyle='white';"
-        "ctx.fillRect(0,0,width,height);"
-        "const drawAvatar=function(img){"
-        "const centerX=40+35;"
-        "const centerY=35+35;"
-        "const radius=35;"
-        "ctx.save();"
-        "ctx.beginPath();"
-        "ctx.arc(centerX,centerY,radius,0,Math.PI*2);"
-        "ctx.closePath();"
-        "ctx.clip();"
-        "ctx.drawImage(img,40,35,radius*2,radius*2);"
-        "ctx.restore();"
-        "ctx.save();"
-        "ctx.beginPath();"
-        "ctx.arc(centerX,centerY,radius,0,Math.PI*2);"
-        "ctx.lineWidth=2;"
-        "ctx.strokeStyle='#ddd';"
-        "ctx.stroke();"
-        "ctx.restore();"
-        "};"
-        "let avatarDrawn=false;"
-        "const renderAvatar=function(img){"
-        "if(avatarDrawn)return;"
-        "avatarDrawn=true;"
-        "drawAvatar(img);"
-        "};"
-        "const drawHeader=function(){"
-        "ctx.save();"
-        "ctx.font='bold 26px Sans-serif';"
-        "ctx.fillStyle='#000';"
-        "ctx.textBaseline='middle';"
-        "ctx.fillText(opts.username||'',100,50);"
-        "ctx.font='16px Sans-serif';"
-        "ctx.fillStyle='#555';"
-        "const avgChat=parseFloat(opts.avgChat)||0;"
-        "const avgVoice=parseFloat(opts.avgVoice)||0;"
-        "ctx.fillText('Today\\'s Activity — Chat '+(opts.todayChat||0)+' min, Voice '+(opts.todayVoice||0)+' min',100,85);"
-        "ctx.fillText('30-Day Average — Chat '+avgChat.toFixed(1)+' min, Voice '+avgVoice.toFixed(1)+' min',100,115);"
-        "ctx.restore();"
-        "};"
-        "ctx.save();"
-        "ctx.strokeStyle='#ddd';"
-        "ctx.lineWidth=1;"
-        "ctx.beginPath();"
-        "ctx.moveTo(0,150);"
-        "ctx.lineTo(width,150);"
-        "ctx.stroke();"
-        "ctx.restore();"
-        "let headerDrawn=false;"
-        "const renderHeader=function(){"
-        "if(headerDrawn)return;"
-        "headerDrawn=true;"
-        "drawHeader();"
-        "};"
-        "if(opts.avatarData){"
-        "const img=new Image();"
-        "img.onload=function(){"
-        "renderAvatar(img);"
-        "renderHeader();"
-        "};"
-        "img.src=opts.avatarData;"
-        "if(img.complete){"
-        "renderAvatar(img);"
-        "renderHeader();"
-        "}"
-        "}else{"
-        "renderHeader();"
-        "}"
-        "ctx.restore();"
-        "}"
-        "}"
-    )
-
-    options = {
-        "responsive": True,
-        "maintainAspectRatio": False,
-        "interaction": {"mode": "index", "intersect": False},
-        "layout": {"padding": {"top": 170, "left": 40, "right": 40, "bottom": 40}},
-        "scales": {
-            "x": {
-                "grid": {"color": "rgba(0,0,0,0.05)"},
-                "ticks": {"color": "#333333", "maxRotation": 0, "minRotation": 0},
-            },
-            "y": {
-                "grid": {"color": "rgba(0,0,0,0.05)"},
-                "ticks": {"color": "#333333"},
-            },
-        },
-        "plugins": {
-            "legend": {
-                "position": "bottom",
-                "labels": {"color": "#333333", "boxWidth": 12, "usePointStyle": True},
-            },
-            "statsHeader": {
-                "avatarData": avatar_data,
-                "username": f"{target.display_name}",
-                "todayChat": today_chat,
-                "todayVoice": today_voice,
-                "avgChat": avg_chat,
-                "avgVoice": avg_voice,
-            },
-        },
+    stats_header = {
+        "avatarData": avatar_data,
+        "username": f"{target.display_name}",
+        "todayChat": today_chat,
+        "todayVoice": today_voice,
+        "avgChat": avg_chat,
+        "avgVoice": avg_voice,
     }
-    config_str = (
-        "{"
-        '"type":"line",'
-        f'"data":{json.dumps(chart_data)},'
-        f'"options":{json.dumps(options)},'
-        f'"plugins":[{header_plugin}]'
-        "}"
-    )
+    options_json = _STATS_OPTIONS_JSON_HEAD + _json_dumps(stats_header) + _STATS_OPTIONS_JSON_TAIL
+    config_str = _STATS_CHART_SKELETON % (chart_data_json, options_json, _STATS_HEADER_PLUGIN)
     chart_request_payload = {
         "chart": config_str,
         "backgroundColor": "white",
@@ -1804,22 +1980,22 @@ async def stats_command(
     }
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                QUICKCHART_CREATE_URL,
-                json=chart_request_payload,
-                timeout=10,
-            ) as response:
-                resp_text = await response.text()
-                resp_data = None
-                try:
-                    resp_data = json.loads(resp_text)
-                except Exception:
-                    resp_data = {}
-                if response.status != 200 or "url" not in resp_data:
-                    print("QuickChart create failed", response.status, resp_text)
-                    raise aiohttp.ClientError("quickchart create failed")
-                chart_url = resp_data["url"]
+        async with _get_http_session().post(
+            QUICKCHART_CREATE_URL,
+            data=_json_dumps(chart_request_payload),
+            headers=_JSON_HEADERS,
+            timeout=HTTP_TIMEOUT,
+        ) as response:
+            resp_text = await response.text()
+            resp_data = None
+            try:
+                resp_data = json.loads(resp_text)
+            except Exception:
+                resp_data = {}
+            if response.status != 200 or "url" not in resp_data:
+                print("QuickChart create failed", response.status, resp_text)
+                raise aiohttp.ClientError("quickchart create failed")
+            chart_url = resp_data["url"]
     except Exception as exc:
         print("QuickChart request failed:", exc)
         await _safe_send(
@@ -1876,17 +2052,39 @@ def _build_rules_detail(choice_index: int, config: dict) -> discord.Embed:
 
 
 def _get_rules_config(guild_id: int | None) -> dict:
+    # Callers may edit the returned dict, but must persist it through _set_rules_config.
+    cached = _RULES_CONFIG_CACHE.get(guild_id)
+    if cached is not None:
+        return cached
     base = RULES_STATE.get(guild_id) if guild_id and guild_id in RULES_STATE else None
     if not base:
-        return _sanitize_rules_config({**RULES_DEFAULT})
-    merged = _sanitize_rules_config({**RULES_DEFAULT, **base})
+        merged = _sanitize_rules_config({**RULES_DEFAULT})
+    else:
+        merged = _sanitize_rules_config({**RULES_DEFAULT, **base})
+    _RULES_CONFIG_CACHE[guild_id] = merged
     return merged
 
 
 def _set_rules_config(guild_id: int | None, config: dict) -> None:
     if guild_id is None:
         return
-    RULES_STATE[guild_id] = _sanitize_rules_config({**config})
+    incoming = {**config}
+    # Callers edit configs that came back sanitized; drop the marker so their edits are re-checked.
+    incoming.pop("_sanitized_v", None)
+    sanitized = _sanitize_rules_config(incoming)
+    RULES_STATE[guild_id] = sanitized
+    _RULES_CONFIG_CACHE[guild_id] = _sanitize_rules_config({**RULES_DEFAULT, **sanitized})
+
+
+async def _bounded_gather(coros, limit: int = 5) -> list:
+    """Like gather(return_exceptions=True), but with at most `limit` coroutines running at once."""
+    sem = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with sem:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros), return_exceptions=True)
 
 
 async def _ensure_defer(interaction: discord.Interaction, ephemeral: bool = False) -> None:
@@ -1917,6 +2115,8 @@ def _safe_emoji(value: Any):
 
 
 def _sanitize_rules_config(config: dict) -> dict:
+    if config.get("_sanitized_v") == RULES_SANITIZED_VERSION and isinstance(config.get("categories"), list):
+        return config
     categories = []
     for item in config.get("categories", []):
         emoji_val = _safe_emoji(item.get("emoji"))
@@ -1936,21 +2136,23 @@ def _sanitize_rules_config(config: dict) -> dict:
         config["footerText"] = str(footer)[:120]
     else:
         config["footerText"] = None
+    config["_sanitized_v"] = RULES_SANITIZED_VERSION
     return config
 
 
+# base64 data URI, or an http(s) URL whose path (before any query string) ends in an image extension
+_IMAGE_LINK_RE = re.compile(
+    r"data:image/.*?base64,|https?://[^?]*\.(?:png|jpe?g|webp|gif)(?:\?|\Z)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+@functools.lru_cache(maxsize=1024)
 def _is_image_link(url: str) -> bool:
-    if not url:
-        return False
-    lowered = url.lower()
-    if lowered.startswith("data:image/") and "base64," in lowered:
-        return True
-    if not lowered.startswith(("http://", "https://")):
-        return False
-    trimmed = lowered.split("?", 1)[0]
-    return trimmed.endswith((".png", ".jpg", ".jpeg", ".webp", ".gif"))
+    return bool(url) and _IMAGE_LINK_RE.match(url) is not None
 
 
+@functools.lru_cache(maxsize=1024)
 def _valid_banner(url: str) -> bool:
     if not url:
         return False
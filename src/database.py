@@ -277,13 +277,14 @@ class Database:
         
         # Build update query
         fields = ', '.join([f"{k} = ?" for k in kwargs.keys()])
-        values = list(kwargs.values()) + [guild_id]
+        values = list(kwargs.values())
         
+        # Values are bound once for the INSERT and once more for the UPDATE
         cursor.execute(f"""
             INSERT INTO guild_configs (guild_id, {', '.join(kwargs.keys())})
             VALUES (?, {', '.join(['?'] * len(kwargs))})
             ON CONFLICT(guild_id) DO UPDATE SET {fields}, updated_at = CURRENT_TIMESTAMP
-        """, [guild_id] + list(kwargs.values()) + values)
+        """, [guild_id] + values + values)
         
         conn.commit()
         conn.close()
@@ -421,6 +422,15 @@ class Database:
         
         return [dict(row) for row in rows]
     
+    def get_all_reaction_roles(self) -> List[tuple]:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT guild_id, message_id, channel_id, emoji, role_id FROM reaction_roles")
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+    
     def delete_reaction_role(self, guild_id: int, message_id: int, emoji: str):
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
@@ -431,6 +441,15 @@ class Database:
         conn.commit()
         conn.close()
     
+    def delete_reaction_roles_for_message(self, guild_id: int, message_id: int):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("DELETE FROM reaction_roles WHERE guild_id = ? AND message_id = ?", (guild_id, message_id))
+        
+        conn.commit()
+        conn.close()
+    
     # Warnings Methods
     def add_warning(self, guild_id: int, user_id: int, moderator_id: int, reason: str):
         conn = sqlite3.connect(self.db_path)
@@ -465,6 +484,27 @@ class Database:
         conn.commit()
         conn.close()
     
+    def write_warnings(self, ops: List[tuple]):
+        """Apply queued warning writes in order, in one transaction.
+
+        Each op is ("add", guild_id, user_id, moderator_id, reason, created_at)
+        or ("clear", guild_id, user_id).
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        for op in ops:
+            if op[0] == "add":
+                cursor.execute("""
+                    INSERT INTO warnings (guild_id, user_id, moderator_id, reason, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, op[1:])
+            elif op[0] == "clear":
+                cursor.execute("DELETE FROM warnings WHERE guild_id = ? AND user_id = ?", op[1:])
+        
+        conn.commit()
+        conn.close()
+    
     # Dashboard Sessions
     def create_session(self, session_id: str, user_id: int, access_token: str, refresh_token: str, expires_at: str):
         conn = sqlite3.connect(self.db_path)
@@ -618,6 +658,21 @@ class Database:
         conn.commit()
         conn.close()
     
+    def set_level_roles(self, guild_id: int, level_roles: List[tuple]):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.executemany("""
+            INSERT INTO level_roles (guild_id, level, role_id)
+            VALUES (?, ?, ?)
+            ON CONFLICT(guild_id, level) DO UPDATE SET
+                role_id = ?,
+                created_at = CURRENT_TIMESTAMP
+        """, [(guild_id, level, role_id, role_id) for level, role_id in level_roles])
+        
+        conn.commit()
+        conn.close()
+    
     def get_level_role(self, guild_id: int, level: int) -> Optional[int]:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
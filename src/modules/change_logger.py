@@ -1,8 +1,9 @@
+import asyncio
 import os
-import threading
+import re
 import time
-from collections import defaultdict
-from typing import Any, Dict, List
+from collections import Counter
+from typing import Any, Dict, List, Tuple
 
 import discord
 
@@ -14,9 +15,23 @@ except Exception:
     Observer = None
 
 LOG_CHANNEL_ID = os.getenv("LOG_CHANNEL_ID", "1447010974652694750")
+_LOG_CHANNEL_ID_INT: int | None = int(LOG_CHANNEL_ID) if LOG_CHANNEL_ID.isdigit() else None
 EMBED_COLOR = 0x22C55E
 DEBOUNCE_SECONDS = 7
 IGNORED_PATTERNS = ("node_modules", ".git", "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "logs")
+_IGNORE_RE = re.compile("|".join(re.escape(part) for part in IGNORED_PATTERNS))
+_EVENT_KIND = {"created": "add", "added": "add", "deleted": "unlink", "removed": "unlink"}
+
+# (kind, relative path) where kind is already one of "add" / "change" / "unlink"
+ChangeEvent = Tuple[str, str]
+
+
+def _file_ext(path: str) -> str:
+    # Same result as os.path.splitext on the basename, without the full path parse.
+    stem, dot, ext = path.rpartition("/")[2].rpartition(".")
+    if not dot or not stem.strip("."):
+        return "misc"
+    return ext.lower() or "misc"
 
 
 def start_change_logger(client: discord.Client, root_dir: str | None = None) -> Any:
@@ -24,48 +39,56 @@ def start_change_logger(client: discord.Client, root_dir: str | None = None) ->
         return None
 
     root = root_dir or os.getcwd()
-    queue: List[Dict[str, str]] = []
-    lock = threading.Lock()
-    timer: list[Any] = [None]
+    loop = client.loop
+    # Only touched on the bot loop; watchdog's thread hands events over via call_soon_threadsafe.
+    queue: asyncio.Queue[ChangeEvent] = asyncio.Queue()
+    flush_handle: list[Any] = [None]
+    log_channel: list[discord.TextChannel | None] = [None]
 
     class Handler(FileSystemEventHandler):
         def on_any_event(self, event):
             if event.is_directory:
                 return
-            if any(part in event.src_path for part in IGNORED_PATTERNS):
+            if _IGNORE_RE.search(event.src_path):
                 return
             rel = os.path.relpath(event.src_path, root).replace("\\", "/")
-            with lock:
-                queue.append({"type": event.event_type, "file": rel})
-                if timer[0] is None:
-                    timer[0] = threading.Timer(DEBOUNCE_SECONDS, flush)
-                    timer[0].start()
-
-    def summarize(events: List[Dict[str, str]]):
-        counts = {"add": 0, "change": 0, "unlink": 0, "ext": defaultdict(int), "files": {"add": [], "change": [], "unlink": []}}
-        for ev in events:
-            key = "change"
-            if ev["type"] in ("created", "added"):
-                key = "add"
-            elif ev["type"] in ("deleted", "removed"):
-                key = "unlink"
-            counts[key] += 1
-            ext = os.path.splitext(ev["file"])[1].replace(".", "").lower() or "misc"
-            counts["ext"][ext] += 1
-            counts["files"][key].append(ev["file"])
-        total = counts["add"] + counts["change"] + counts["unlink"]
-        return counts, total
-
-    async def send_embed(events: List[Dict[str, str]]):
-        channel = None
-        if LOG_CHANNEL_ID.isdigit():
-            channel = client.get_channel(int(LOG_CHANNEL_ID))
-            if not channel:
-                try:
-                    channel = await client.fetch_channel(int(LOG_CHANNEL_ID))
-                except Exception:
-                    channel = None
+            loop.call_soon_threadsafe(enqueue, (_EVENT_KIND.get(event.event_type, "change"), rel))
+
+    def summarize(events: List[ChangeEvent]):
+        files: Dict[str, List[str]] = {"add": [], "change": [], "unlink": []}
+        ext_counter: Counter = Counter()
+        for kind, file in events:
+            files[kind].append(file)
+            ext_counter[_file_ext(file)] += 1
+        counts = {
+            "add": len(files["add"]),
+            "change": len(files["change"]),
+            "unlink": len(files["unlink"]),
+            "ext": ext_counter,
+            "files": files,
+        }
+        return counts, len(events)
+
+    async def resolve_channel() -> discord.TextChannel | None:
+        channel = log_channel[0]
+        if channel is not None and client.get_guild(channel.guild.id) is not None:
+            return channel
+        if _LOG_CHANNEL_ID_INT is None:
+            return None
+        channel = client.get_channel(_LOG_CHANNEL_ID_INT)
+        if not channel:
+            try:
+                channel = await client.fetch_channel(_LOG_CHANNEL_ID_INT)
+            except Exception:
+                channel = None
         if not channel or not isinstance(channel, discord.TextChannel):
+            return None
+        log_channel[0] = channel
+        return channel
+
+    async def send_embed(events: List[ChangeEvent]):
+        channel = await resolve_channel()
+        if channel is None:
             return
 
         counts, total = summarize(events)
@@ -77,7 +100,7 @@ def start_change_logger(client: discord.Client, root_dir: str | None = None) ->
         if counts["unlink"]:
             actions.append(f"removed {counts['unlink']}")
         headline = f"Workspace touched {total} item(s) ({', '.join(actions)})." if total else "No recent changes logged."
-        top_exts = sorted(counts["ext"].items(), key=lambda x: x[1], reverse=True)[:3]
+        top_exts = counts["ext"].most_common(3)
         highlights = ", ".join(f"{label}: {num}" for label, num in top_exts) if top_exts else ""
 
         def format_list(items: List[str]) -> str:
@@ -99,21 +122,24 @@ def start_change_logger(client: discord.Client, root_dir: str | None = None) ->
         embed.timestamp = discord.utils.utcnow()
         try:
             await channel.send(embed=embed)
+        except discord.NotFound:
+            log_channel[0] = None
         except Exception:
             return
 
+    def enqueue(item: ChangeEvent):
+        queue.put_nowait(item)
+        if flush_handle[0] is None:
+            flush_handle[0] = loop.call_later(DEBOUNCE_SECONDS, flush)
+
     def flush():
-        with lock:
-            events = list(queue)
-            queue.clear()
-            timer[0] = None
+        flush_handle[0] = None
+        events: List[ChangeEvent] = []
+        while not queue.empty():
+            events.append(queue.get_nowait())
         if not events:
             return
-        try:
-            loop = client.loop
-            loop.create_task(send_embed(events))
-        except Exception:
-            return
+        loop.create_task(send_embed(events))
 
     observer = Observer()
     observer.schedule(Handler(), root, recursive=True)
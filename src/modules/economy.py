@@ -201,7 +201,7 @@ def setup_economy_commands(bot, economy: EconomySystem):
     @bot.tree.command(name="addmoney", description="Add money to a user (Admin only)")
     @app_commands.describe(user="User to give money", amount="Amount to add")
     async def addmoney_command(interaction: discord.Interaction, user: discord.User, amount: int):
-        if not interaction.user.guild_permissions.administrator:
+        if not interaction.permissions.administrator:
             await interaction.response.send_message("❌ You need administrator permission!", ephemeral=True)
             return
         
@@ -214,7 +214,7 @@ def setup_economy_commands(bot, economy: EconomySystem):
     @bot.tree.command(name="removemoney", description="Remove money from a user (Admin only)")
     @app_commands.describe(user="User to remove money from", amount="Amount to remove")
     async def removemoney_command(interaction: discord.Interaction, user: discord.User, amount: int):
-        if not interaction.user.guild_permissions.administrator:
+        if not interaction.permissions.administrator:
             await interaction.response.send_message("❌ You need administrator permission!", ephemeral=True)
             return
         
@@ -10,10 +10,17 @@ class GiveawayState:
     def __init__(self):
         self.giveaways: Dict[int, Dict[int, Dict[str, Any]]] = {}  # guild_id -> message_id -> data
         self.tasks: Dict[int, asyncio.Task] = {}
+        # Strong refs to fire-and-forget tasks so they aren't collected mid-run
+        self.background: Set[asyncio.Task] = set()
         self.bot: discord.Client | None = None
 
 
 STATE = GiveawayState()
+GIVEAWAY_EDIT_DELAY = 1.0
+_LI = b"<li>%d</li>".__mod__
+_TRANSCRIPT_TAIL = b"""</ul>
+</body></html>
+"""
 
 
 def init_giveaway(bot: discord.Client) -> None:
@@ -40,34 +47,38 @@ async def handle_giveaway_button(interaction: discord.Interaction) -> bool:
         return True
 
     entrants: Set[int] = giveaway.setdefault("entrants", set())
-    entrants.add(interaction.user.id)
-
-    # Try to update entry count live
-    bot = STATE.bot
-    if bot:
-        try:
-            channel = bot.get_channel(giveaway["channel_id"]) or await bot.fetch_channel(giveaway["channel_id"])
-            message = await channel.fetch_message(msg_id)
-            if message and message.embeds:
-                embed = message.embeds[0]
-                new_embed = discord.Embed(title=embed.title, description=embed.description, color=embed.color)
-                for f in embed.fields:
-                    if f.name.lower() == "entries":
-                        new_embed.add_field(name=f.name, value=str(len(entrants)), inline=f.inline)
-                    else:
-                        new_embed.add_field(name=f.name, value=f.value, inline=f.inline)
-                if embed.footer:
-                    new_embed.set_footer(text=embed.footer.text or "")
-                if embed.image and embed.image.url:
-                    new_embed.set_image(url=embed.image.url)
-                await message.edit(embed=new_embed)
-        except Exception:
-            pass
+    uid = interaction.user.id
+    if uid not in entrants:
+        entrants.add(uid)
+        giveaway.setdefault("entrants_list", []).append(uid)
+
+    # Clicks tend to arrive in bursts; fold them into one edit per GIVEAWAY_EDIT_DELAY.
+    if not giveaway.get("edit_pending"):
+        giveaway["edit_pending"] = True
+        task = asyncio.create_task(_flush_entry_count(giveaway))
+        STATE.background.add(task)
+        task.add_done_callback(STATE.background.discard)
 
     await _safe_response(interaction, content="You are entered!", ephemeral=True)
     return True
 
 
+async def _flush_entry_count(giveaway: Dict[str, Any]) -> None:
+    await asyncio.sleep(GIVEAWAY_EDIT_DELAY)
+    giveaway["edit_pending"] = False
+    message = giveaway.get("message")
+    embed = giveaway.get("embed")
+    if giveaway.get("done") or message is None or embed is None:
+        return
+    embed.set_field_at(
+        giveaway["entries_field_index"], name="Entries", value=str(len(giveaway["entrants"])), inline=True
+    )
+    try:
+        await message.edit(embed=embed)
+    except Exception:
+        pass
+
+
 async def start_giveaway(
     channel: discord.abc.Messageable,
     guild_id: int,
@@ -101,17 +112,29 @@ async def start_giveaway(
         "channel_id": message.channel.id,
         "guild_id": guild_id,
         "entrants": set(),  # user ids
+        "entrants_list": [],  # same ids in entry order, for drawing a winner without copying the set
         "done": False,
+        # Kept so entry counts can be patched without refetching the message
+        "message": message,
+        "embed": embed,
+        "entries_field_index": 2,
+        "edit_pending": False,
+        # Absolute loop time the giveaway ends at, so a resumed timer never drifts past it
+        "deadline": asyncio.get_running_loop().time() + max(0, duration_minutes * 60),
     }
     _get_guild_giveaways(guild_id)[message.id] = giveaway_data
 
-    task = asyncio.create_task(_schedule_end(guild_id, message.id, duration_minutes))
+    task = asyncio.create_task(_schedule_end(guild_id, message.id, giveaway_data["deadline"]))
     STATE.tasks[message.id] = task
+    task.add_done_callback(lambda t, mid=message.id: STATE.tasks.pop(mid, None) if STATE.tasks.get(mid) is t else None)
     return message.id
 
 
-async def _schedule_end(guild_id: int, message_id: int, duration_minutes: int):
-    await asyncio.sleep(max(0, duration_minutes * 60))
+async def _schedule_end(guild_id: int, message_id: int, deadline: float):
+    loop = asyncio.get_running_loop()
+    # Re-check against the deadline in case the sleep wakes early.
+    while (remaining := deadline - loop.time()) > 0:
+        await asyncio.sleep(remaining)
     await end_giveaway(guild_id, message_id, auto=True)
 
 
@@ -134,7 +157,7 @@ async def end_giveaway(guild_id: int, message_id: int, interaction: discord.Inte
     if not giveaway or giveaway.get("done"):
         return
     giveaway["done"] = True
-    entrants: List[int] = list(giveaway.get("entrants", []))
+    entrants: List[int] = giveaway.get("entrants_list", [])
     winner_id = random.choice(entrants) if entrants else None
 
     bot: discord.Client | None = STATE.bot
@@ -154,8 +177,7 @@ async def end_giveaway(guild_id: int, message_id: int, interaction: discord.Inte
     embed.add_field(name="Winner", value=f"<@{winner_id}>" if winner_id else "No entries", inline=False)
     embed.add_field(name="Transcript", value="Attached HTML file", inline=False)
 
-    transcript = _build_transcript_html(giveaway, entrants, winner_id)
-    file = discord.File(io.BytesIO(transcript.encode("utf-8")), filename="giveaway_transcript.html")
+    file = discord.File(_build_transcript_html(giveaway, entrants, winner_id), filename="giveaway_transcript.html")
 
     if channel:
         try:
@@ -172,15 +194,17 @@ async def end_giveaway(guild_id: int, message_id: int, interaction: discord.Inte
             pass
 
     task = STATE.tasks.pop(message_id, None)
-    if task:
+    # When the timer itself ended the giveaway, let it finish instead of cancelling it.
+    if task and not task.done() and task is not asyncio.current_task():
         task.cancel()
     giveaways.pop(message_id, None)
 
 
-def _build_transcript_html(giveaway: Dict[str, Any], entrants: List[int], winner_id: int | None) -> str:
-    entries_html = "".join([f"<li>{uid}</li>" for uid in entrants]) or "<li>No entries</li>"
+def _build_transcript_html(giveaway: Dict[str, Any], entrants: List[int], winner_id: int | None) -> io.BytesIO:
     winner_html = f"<p>Winner: {winner_id}</p>" if winner_id else "<p>No winner</p>"
-    return f"""
+    # Written straight into the buffer discord.File reads from, so the page never exists as str and bytes at once.
+    buf = io.BytesIO()
+    buf.write(f"""
 <!doctype html>
 <html><head><meta charset="utf-8"><title>Giveaway Transcript</title></head>
 <body>
@@ -189,9 +213,14 @@ def _build_transcript_html(giveaway: Dict[str, Any], entrants: List[int], winner
 <p>Description: {giveaway.get('description','')}</p>
 {winner_html}
 <h2>Entrants</h2>
-<ul>{entries_html}</ul>
-</body></html>
-"""
+<ul>""".encode("utf-8"))
+    if entrants:
+        buf.writelines(map(_LI, entrants))
+    else:
+        buf.write(b"<li>No entries</li>")
+    buf.write(_TRANSCRIPT_TAIL)
+    buf.seek(0)
+    return buf
 
 
 async def _safe_response(interaction: discord.Interaction, **kwargs) -> None:
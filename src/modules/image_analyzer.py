@@ -22,8 +22,11 @@ def analyze_image_stub(image_url: str) -> Dict[str, Any]:
         cleaned = _preprocess_image(buffer)
         text = _run_ocr(cleaned)
         template = _build_template_from_text(text)
-        channel_total = sum(len(cat.get("channels", [])) for cat in template.get("categories", []))
-        template["summary"] = f"{len(template.get('categories', []))} categories / {channel_total} channels (OCR)"
+        categories = template.get("categories") or ()
+        channel_total = sum(len(cat.get("channels") or ()) for cat in categories)
+        template["_category_count"] = len(categories)
+        template["_channel_count"] = channel_total
+        template["summary"] = f"{len(categories)} categories / {channel_total} channels (OCR)"
         return template
     except Exception as err:  
         return _fallback_template(str(err))
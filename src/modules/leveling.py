@@ -1,23 +1,77 @@
 """
 XP and leveling system for the bot.
 """
+import asyncio
 import discord
 from discord import app_commands
 from discord.ext import commands
-from datetime import datetime, timedelta
+from datetime import datetime
+import bisect
 import random
-import math
+import time
+from math import isqrt
+
+XP_COOLDOWN_SECONDS = 60.0
+# Drop expired cooldown entries every this many XP grants, so one-off chatters don't pile up.
+XP_COOLDOWN_SWEEP_EVERY = 1000
+# Role name prefix by level: below 10 -> Beginner, below 30 -> Member, ...
+_LEVEL_NAME_BOUNDS = (10, 30, 50, 80)
+_LEVEL_NAMES = ("Beginner", "Member", "Veteran", "Elite", "Legend")
+# Role color for the closest of these levels
+_LEVEL_COLOR_THRESHOLDS = (5, 10, 20, 30, 50, 80, 100)
+_LEVEL_COLORS = (
+    0x95A5A6,  # Gray
+    0x3498DB,  # Blue
+    0x2ECC71,  # Green
+    0x9B59B6,  # Purple
+    0xE74C3C,  # Red
+    0xF39C12,  # Orange
+    0xF1C40F,  # Gold
+)
+# How long a guild's config is reused before re-reading it from the database.
+# Config is only edited from the dashboard process, so this TTL is the only invalidation.
+GUILD_CONFIG_TTL = 5.0
+# Level roles change rarely; the bot drops its copy on its own edits, this bounds dashboard edits.
+LEVEL_ROLES_TTL = 60.0
 
 
 class LevelingSystem:
     def __init__(self, db):
         self.db = db
-        self.xp_cooldowns = {}
+        # (guild_id, user_id) -> time.monotonic() when the user may gain XP again
+        self.xp_cooldowns: dict[tuple[int, int], float] = {}
+        self._cooldown_inserts = 0
+        # guild_id -> (time.monotonic() when read, guild config, (xp_min, number of possible XP values))
+        self._cfg_cache: dict[int, tuple[float, dict, tuple[int, int]]] = {}
+        # guild_id -> (time.monotonic() when read, [(level, role_id), ...] sorted by level)
+        self._level_roles_cache: dict[int, tuple[float, list[tuple[int, int]]]] = {}
+        # Bound once; these run on every XP-granting message
+        self._random = random.random
+        self._db_add_xp = db.add_user_xp
+    
+    def _load_config(self, guild_id: int) -> tuple[float, dict, tuple[int, int]]:
+        """Get the cached config entry, re-reading it after GUILD_CONFIG_TTL"""
+        now = time.monotonic()
+        cached = self._cfg_cache.get(guild_id)
+        if cached and now - cached[0] < GUILD_CONFIG_TTL:
+            return cached
+        config = self.db.get_guild_config(guild_id) or {}
+        min_xp = config.get("xp_min", 15)
+        cached = self._cfg_cache[guild_id] = (now, config, (min_xp, max(1, config.get("xp_max", 25) - min_xp + 1)))
+        return cached
+    
+    def _get_config(self, guild_id: int) -> dict:
+        """Get guild config"""
+        return self._load_config(guild_id)[1]
+    
+    def _get_xp_range(self, guild_id: int) -> tuple[int, int]:
+        """Get (xp_min, number of possible XP values) for message XP"""
+        return self._load_config(guild_id)[2]
     
     def calculate_level(self, xp: int) -> int:
         """Calculate level from XP"""
-        # Level = floor(sqrt(XP / 100))
-        return int(math.sqrt(xp / 100))
+        # Level = floor(sqrt(XP / 100)), in integer math so large XP stays exact
+        return isqrt(xp // 100)
     
     def calculate_xp_for_level(self, level: int) -> int:
         """Calculate XP needed for a specific level"""
@@ -31,10 +85,10 @@ class LevelingSystem:
     
     def add_xp(self, guild_id: int, user_id: int, amount: int) -> tuple[int, int, bool]:
         """Add XP to user, returns (new_xp, new_level, leveled_up)"""
-        old_xp, old_level = self.get_user_xp(guild_id, user_id)
-        new_xp = self.db.add_user_xp(guild_id, user_id, amount)
-        new_level = self.calculate_level(new_xp)
-        leveled_up = new_level > old_level
+        # add_user_xp returns the total after the upsert, so the old total is just new_xp - amount
+        new_xp = self._db_add_xp(guild_id, user_id, amount)
+        new_level = isqrt(new_xp // 100)
+        leveled_up = new_level > isqrt((new_xp - amount) // 100)
         return new_xp, new_level, leveled_up
     
     def set_xp(self, guild_id: int, user_id: int, xp: int) -> tuple[int, int]:
@@ -45,21 +99,26 @@ class LevelingSystem:
     
     def can_gain_xp(self, guild_id: int, user_id: int) -> bool:
         """Check if user is off cooldown for XP gain"""
-        key = f"{guild_id}_{user_id}"
-        if key in self.xp_cooldowns:
-            return datetime.utcnow() >= self.xp_cooldowns[key]
-        return True
+        ready_at = self.xp_cooldowns.get((guild_id, user_id))
+        return ready_at is None or time.monotonic() >= ready_at
+    
+    def _sweep_cooldowns(self, now: float):
+        """Forget cooldowns that have already expired"""
+        expired = [key for key, ready_at in self.xp_cooldowns.items() if ready_at <= now]
+        for key in expired:
+            del self.xp_cooldowns[key]
     
     def gain_message_xp(self, guild_id: int, user_id: int) -> tuple[int, int, bool]:
         """Gain XP from sending a message"""
-        key = f"{guild_id}_{user_id}"
-        self.xp_cooldowns[key] = datetime.utcnow() + timedelta(seconds=60)
-        
-        config = self.db.get_guild_config(guild_id) or {}
-        min_xp = config.get("xp_min", 15)
-        max_xp = config.get("xp_max", 25)
-        
-        xp_gain = random.randint(min_xp, max_xp)
+        now = time.monotonic()
+        self.xp_cooldowns[(guild_id, user_id)] = now + XP_COOLDOWN_SECONDS
+        self._cooldown_inserts += 1
+        if self._cooldown_inserts >= XP_COOLDOWN_SWEEP_EVERY:
+            self._cooldown_inserts = 0
+            self._sweep_cooldowns(now)
+        
+        min_xp, width = self._get_xp_range(guild_id)
+        xp_gain = min_xp + int(self._random() * width)
         return self.add_xp(guild_id, user_id, xp_gain)
     
     def get_leaderboard(self, guild_id: int, limit: int = 10):
@@ -71,8 +130,18 @@ class LevelingSystem:
         return self.db.get_level_role(guild_id, level)
     
     def get_all_level_roles(self, guild_id: int):
-        """Get all level roles"""
-        return self.db.get_all_level_roles(guild_id)
+        """Get all level roles, sorted by level"""
+        now = time.monotonic()
+        cached = self._level_roles_cache.get(guild_id)
+        if cached and now - cached[0] < LEVEL_ROLES_TTL:
+            return cached[1]
+        level_roles = self.db.get_all_level_roles(guild_id)
+        self._level_roles_cache[guild_id] = (now, level_roles)
+        return level_roles
+    
+    def invalidate_level_roles(self, guild_id: int):
+        """Drop the cached level roles; call after adding or removing one"""
+        self._level_roles_cache.pop(guild_id, None)
     
     def get_default_level_milestones(self):
         """Get default level milestones for role creation"""
@@ -80,65 +149,78 @@ class LevelingSystem:
     
     def generate_level_role_name(self, level: int) -> str:
         """Generate a name for a level role"""
-        if level < 10:
-            return f"Beginner {level}"
-        elif level < 30:
-            return f"Member {level}"
-        elif level < 50:
-            return f"Veteran {level}"
-        elif level < 80:
-            return f"Elite {level}"
-        else:
-            return f"Legend {level}"
+        return f"{_LEVEL_NAMES[bisect.bisect_right(_LEVEL_NAME_BOUNDS, level)]} {level}"
     
     def generate_level_role_color(self, level: int) -> int:
         """Generate a color for a level role based on level"""
-        colors = {
-            5: 0x95A5A6,   # Gray
-            10: 0x3498DB,  # Blue
-            20: 0x2ECC71,  # Green
-            30: 0x9B59B6,  # Purple
-            50: 0xE74C3C,  # Red
-            80: 0xF39C12,  # Orange
-            100: 0xF1C40F  # Gold
-        }
-        # Find closest color
-        closest = min(colors.keys(), key=lambda x: abs(x - level))
-        return colors[closest]
+        # Closest threshold wins; on a tie the lower one does
+        i = bisect.bisect_left(_LEVEL_COLOR_THRESHOLDS, level)
+        if i == len(_LEVEL_COLOR_THRESHOLDS):
+            i -= 1
+        elif i and level - _LEVEL_COLOR_THRESHOLDS[i - 1] <= _LEVEL_COLOR_THRESHOLDS[i] - level:
+            i -= 1
+        return _LEVEL_COLORS[i]
 
 
-async def create_leveling_roles(guild: discord.Guild, milestones: list[int], leveling: LevelingSystem, bot):
-    """Create level roles for specified milestones"""
-    created_roles = []
+async def create_leveling_roles(
+    guild: discord.Guild,
+    milestones: list[int],
+    leveling: LevelingSystem,
+    bot,
+    sem: asyncio.Semaphore | None = None,
+):
+    """Create level roles for specified milestones (up to 5 API calls in flight)"""
+    sem = sem or asyncio.Semaphore(5)
+    # Built once rather than scanning guild.roles per milestone; reversed so the first match wins, like utils.get
+    roles_by_name = {role.name: role for role in reversed(guild.roles)}
     
-    for level in milestones:
+    async def create_one(level: int):
         role_name = leveling.generate_level_role_name(level)
         role_color = leveling.generate_level_role_color(level)
         
         try:
             # Check if role already exists
-            existing_role = discord.utils.get(guild.roles, name=role_name)
+            existing_role = roles_by_name.get(role_name)
             if existing_role:
-                bot.db.set_level_role(guild.id, level, existing_role.id)
-                created_roles.append((level, existing_role))
-                continue
+                return level, existing_role, False
             
-            # Create new role
-            role = await guild.create_role(
-                name=role_name,
-                color=discord.Color(role_color),
-                hoist=False,
-                mentionable=False,
-                reason=f"Auto-created level {level} role"
-            )
+            # Create new role; discord.py still handles 429s per request
+            async with sem:
+                role = await guild.create_role(
+                    name=role_name,
+                    color=discord.Color(role_color),
+                    hoist=False,
+                    mentionable=False,
+                    reason=f"Auto-created level {level} role"
+                )
             
-            # Store in database
-            bot.db.set_level_role(guild.id, level, role.id)
-            created_roles.append((level, role))
+            return level, role, True
         except Exception as e:
             print(f"Failed to create role for level {level}: {e}")
+            return None
+    
+    results = await asyncio.gather(*(create_one(level) for level in milestones))
+    created = [(level, role) for level, role, _ in filter(None, results)]
+    
+    # The creates finish in any order; stack the new roles by level (higher level above) so a
+    # member's highest level role is the one that colors their name
+    new_roles = sorted(
+        ((level, role) for level, role, is_new in filter(None, results) if is_new), key=lambda pair: pair[0]
+    )
+    if len(new_roles) > 1:
+        try:
+            await guild.edit_role_positions(
+                {role: position for position, (_, role) in enumerate(new_roles, start=1)},
+                reason="Order auto-created level roles"
+            )
+        except discord.HTTPException as e:
+            print(f"Failed to order level roles: {e}")
     
-    return created_roles
+    # Store in database, one transaction for all milestones
+    if created:
+        bot.db.set_level_roles(guild.id, [(level, role.id) for level, role in created])
+    leveling.invalidate_level_roles(guild.id)
+    return created
 
 
 async def create_leveling_info_channel(guild: discord.Guild, bot):
@@ -299,23 +381,31 @@ async def check_level_roles(bot, guild_id: int, user_id: int, new_level: int):
     
     level_roles = bot.leveling.get_all_level_roles(guild_id)
     
+    current = member.roles[1:]  # roles[0] is @everyone, which can't be sent back
+    have = set(current)
+    adds = set()
+    removes = set()
     for level, role_id in level_roles:
         role = guild.get_role(role_id)
         if not role:
             continue
-        
         if new_level >= level:
-            if role not in member.roles:
-                try:
-                    await member.add_roles(role, reason=f"Reached level {level}")
-                except:
-                    pass
-        else:
-            if role in member.roles:
-                try:
-                    await member.remove_roles(role, reason=f"No longer level {level}")
-                except:
-                    pass
+            if role not in have:
+                adds.add(role)
+        elif role in have:
+            removes.add(role)
+    removes -= adds
+    if not adds and not removes:
+        return
+    
+    # One edit with the final role list instead of an add/remove call per level role
+    try:
+        await member.edit(
+            roles=[role for role in current if role not in removes] + list(adds),
+            reason=f"Level roles for level {new_level}"
+        )
+    except:
+        pass
 
 
 def setup_leveling_commands(bot, leveling: LevelingSystem):
@@ -327,10 +417,9 @@ def setup_leveling_commands(bot, leveling: LevelingSystem):
         target = user or interaction.user
         xp, level = leveling.get_user_xp(interaction.guild_id, target.id)
         
-        current_level_xp = leveling.calculate_xp_for_level(level)
-        next_level_xp = leveling.calculate_xp_for_level(level + 1)
-        xp_progress = xp - current_level_xp
-        xp_needed = next_level_xp - current_level_xp
+        xp_progress = xp - level * level * 100
+        # (level + 1)^2 * 100 - level^2 * 100
+        xp_needed = (2 * level + 1) * 100
         
         # Calculate progress percentage
         progress_percent = (xp_progress / xp_needed) * 100
@@ -362,12 +451,12 @@ def setup_leveling_commands(bot, leveling: LevelingSystem):
             await interaction.response.send_message("No leveling data yet!", ephemeral=True)
             return
         
+        # Mentions render client-side from the ID, so no user lookups are needed
         description = ""
         for i, (user_id, xp) in enumerate(leaders, 1):
-            user = await bot.fetch_user(user_id)
             level = leveling.calculate_level(xp)
             medal = ["🥇", "🥈", "🥉"][i-1] if i <= 3 else f"**{i}.**"
-            description += f"{medal} {user.mention} - Level **{level}** ({xp:,} XP)\n"
+            description += f"{medal} <@{user_id}> - Level **{level}** ({xp:,} XP)\n"
         
         embed = discord.Embed(
             title="📊 XP Leaderboard",
@@ -379,7 +468,7 @@ def setup_leveling_commands(bot, leveling: LevelingSystem):
     @bot.tree.command(name="setlevel", description="Set a user's level (Admin only)")
     @app_commands.describe(user="User to set level", level="Level to set")
     async def setlevel_command(interaction: discord.Interaction, user: discord.User, level: int):
-        if not interaction.user.guild_permissions.administrator:
+        if not interaction.permissions.administrator:
             await interaction.response.send_message("❌ You need administrator permission!", ephemeral=True)
             return
         
@@ -397,7 +486,7 @@ def setup_leveling_commands(bot, leveling: LevelingSystem):
     @bot.tree.command(name="addxp", description="Add XP to a user (Admin only)")
     @app_commands.describe(user="User to give XP", amount="Amount of XP to add")
     async def addxp_command(interaction: discord.Interaction, user: discord.User, amount: int):
-        if not interaction.user.guild_permissions.administrator:
+        if not interaction.permissions.administrator:
             await interaction.response.send_message("❌ You need administrator permission!", ephemeral=True)
             return
         
@@ -414,7 +503,7 @@ def setup_leveling_commands(bot, leveling: LevelingSystem):
     @bot.tree.command(name="levelrole", description="Set a role reward for reaching a level (Admin only)")
     @app_commands.describe(level="Level to reward at", role="Role to give")
     async def levelrole_command(interaction: discord.Interaction, level: int, role: discord.Role):
-        if not interaction.user.guild_permissions.administrator:
+        if not interaction.permissions.administrator:
             await interaction.response.send_message("❌ You need administrator permission!", ephemeral=True)
             return
         
@@ -423,16 +512,18 @@ def setup_leveling_commands(bot, leveling: LevelingSystem):
             return
         
         bot.db.set_level_role(interaction.guild_id, level, role.id)
+        leveling.invalidate_level_roles(interaction.guild_id)
         await interaction.response.send_message(f"✅ Set {role.mention} as reward for reaching level **{level}**", ephemeral=True)
     
     @bot.tree.command(name="removelevelrole", description="Remove a level role reward (Admin only)")
     @app_commands.describe(level="Level to remove reward from")
     async def removelevelrole_command(interaction: discord.Interaction, level: int):
-        if not interaction.user.guild_permissions.administrator:
+        if not interaction.permissions.administrator:
             await interaction.response.send_message("❌ You need administrator permission!", ephemeral=True)
             return
         
         bot.db.remove_level_role(interaction.guild_id, level)
+        leveling.invalidate_level_roles(interaction.guild_id)
         await interaction.response.send_message(f"✅ Removed level role reward for level **{level}**", ephemeral=True)
     
     @bot.tree.command(name="leveling_setup", description="Setup leveling system with roles and info channel (Admin only)")
@@ -447,7 +538,7 @@ def setup_leveling_commands(bot, leveling: LevelingSystem):
         create_info_channel: bool = True,
         create_rules_channel: bool = False
     ):
-        if not interaction.user.guild_permissions.administrator:
+        if not interaction.permissions.administrator:
             await interaction.response.send_message("❌ You need administrator permission!", ephemeral=True)
             return
         
@@ -515,13 +606,13 @@ def init_leveling(bot):
         if not message.guild:
             return
         
-        # Check if leveling is enabled
-        config = bot.db.get_guild_config(message.guild.id) or {}
-        if not config.get("leveling_enabled", True):
+        # Cooldown first: it's an in-memory lookup and rejects most messages in a conversation
+        if not leveling.can_gain_xp(message.guild.id, message.author.id):
             return
         
-        # Check if user can gain XP
-        if not leveling.can_gain_xp(message.guild.id, message.author.id):
+        # Check if leveling is enabled
+        config = leveling._get_config(message.guild.id)
+        if not config.get("leveling_enabled", True):
             return
         
         # Gain XP
@@ -3,76 +3,351 @@ Moderation system with kick, ban, mute, warn, and logging.
 """
 import discord
 from discord import app_commands
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
 from datetime import datetime, timedelta
 import asyncio
+import random
+import time
 
 
-# Store warnings: {guild_id: {user_id: [{"reason": str, "moderator": str, "timestamp": datetime}]}}
-WARNINGS: Dict[int, Dict[int, List[dict]]] = {}
+# Warnings cache: {(guild_id, user_id): (loaded_at, [WarningEntry])}
+# The warnings table is the source of truth; this fronts it so repeat lookups skip SQLite.
+WARNINGS: "OrderedDict[tuple[int, int], tuple[float, List[WarningEntry]]]" = OrderedDict()
+WARNINGS_CACHE_SIZE = 10_000
+# The dashboard clears warnings straight in SQLite, so cached lists are re-read after this long.
+WARNINGS_CACHE_TTL = 5
 
-# Store mute tasks: {guild_id: {user_id: task}}
-MUTE_TASKS: Dict[int, Dict[int, asyncio.Task]] = {}
+# Moderation log channel: {guild_id: (loaded_at, channel_id or None)}, backed by guild_configs.modlog_channel_id
+MOD_LOG_CHANNELS: Dict[int, tuple[float, Optional[int]]] = {}
+# The dashboard can change the channel too, so it is re-read after this long
+MOD_LOG_CHANNEL_TTL = 60
 
-# Moderation log channel: {guild_id: channel_id}
-MOD_LOG_CHANNELS: Dict[int, int] = {}
+# Warning writes are applied to the cache right away and persisted in batches by _warning_writer.
+WRITE_BATCH_SIZE = 50
+# A failed batch is retried this many times, backing off from WRITE_RETRY_DELAY seconds
+WRITE_RETRY_ATTEMPTS = 3
+WRITE_RETRY_DELAY = 0.5
+# How long shutdown waits for queued warning writes to reach the database
+WRITE_FLUSH_TIMEOUT = 10
+_write_queue: "asyncio.Queue[tuple]" = asyncio.Queue()
+# Queued writes not yet in the database, per (guild_id, user_id), replayed over fresh reads
+_pending_ops: Dict[tuple[int, int], List[tuple]] = {}
+# Held while a batch is written or a user's warnings are read, so a read never sees a write half-applied
+_db_lock = asyncio.Lock()
+_db = None
+_writer_task: Optional[asyncio.Task] = None
+
+
+class TokenBucket:
+    """Paces calls to `rate` per second, allowing bursts of up to `capacity`"""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last = time.monotonic()
+    
+    async def acquire(self, cost: int = 1):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens >= cost:
+                self.tokens -= cost
+                return
+            await asyncio.sleep((cost - self.tokens) / self.rate)
+
+
+# (rate per second, burst) per kind of outbound REST write, kept under Discord's per-route limits
+BUCKET_LIMITS = {
+    "log": (1.0, 5),     # mod log embeds: one channel, 5 messages / 5s
+    "dm": (5.0, 5),      # DMs to the member being actioned
+    "action": (5.0, 5),  # kick / ban
+}
+# One bucket per (guild_id, kind) so a ban storm in one guild doesn't slow the others
+_BUCKETS: Dict[tuple[int, str], TokenBucket] = {}
+
+
+async def _throttle(guild_id: int, kind: str):
+    bucket = _BUCKETS.get((guild_id, kind))
+    if bucket is None:
+        bucket = _BUCKETS[(guild_id, kind)] = TokenBucket(*BUCKET_LIMITS[kind])
+    await bucket.acquire()
+
+
+def forget_guild(guild_id: int):
+    """Drop every cached entry for a guild; persisted data is untouched"""
+    MOD_LOG_CHANNELS.pop(guild_id, None)
+    for key in [key for key in WARNINGS if key[0] == guild_id]:
+        del WARNINGS[key]
+    for key in [key for key in _BUCKETS if key[0] == guild_id]:
+        del _BUCKETS[key]
+
+
+async def _warning_writer():
+    """Persist queued warning writes, batching whatever has piled up"""
+    while True:
+        ops = [await _write_queue.get()]
+        while len(ops) < WRITE_BATCH_SIZE and not _write_queue.empty():
+            ops.append(_write_queue.get_nowait())
+        async with _db_lock:
+            for attempt in range(WRITE_RETRY_ATTEMPTS):
+                try:
+                    await asyncio.to_thread(_db.write_warnings, ops)
+                    break
+                except Exception as e:
+                    if attempt == WRITE_RETRY_ATTEMPTS - 1:
+                        print(f"Dropping {len(ops)} warning change(s) after {WRITE_RETRY_ATTEMPTS} attempts: {e}: {ops!r}")
+                    else:
+                        print(f"Failed to persist {len(ops)} warning change(s), retrying: {e}")
+                        await asyncio.sleep(WRITE_RETRY_DELAY * 2 ** attempt)
+            for op in ops:
+                _forget_pending(op)
+                _write_queue.task_done()
+
+
+async def flush_warning_writes():
+    """Wait for queued warning writes to reach the database; called on shutdown"""
+    if _writer_task is None or _writer_task.done():
+        return
+    try:
+        await asyncio.wait_for(_write_queue.join(), WRITE_FLUSH_TIMEOUT)
+    except asyncio.TimeoutError:
+        print(f"Gave up flushing {_write_queue.qsize()} queued warning change(s) on shutdown")
+    _writer_task.cancel()
+
+
+def _queue_write(op: tuple):
+    _write_queue.put_nowait(op)
+    _pending_ops.setdefault((op[1], op[2]), []).append(op)
+
+
+def _forget_pending(op: tuple):
+    key = (op[1], op[2])
+    pending = _pending_ops.get(key)
+    if pending:
+        pending.remove(op)
+        if not pending:
+            del _pending_ops[key]
+
+
+async def _get_mod_log_channel_id(guild_id: int) -> Optional[int]:
+    now = time.monotonic()
+    cached = MOD_LOG_CHANNELS.get(guild_id)
+    if cached and now - cached[0] < MOD_LOG_CHANNEL_TTL:
+        return cached[1]
+    config = await asyncio.to_thread(_db.get_guild_config, guild_id) if _db else None
+    channel_id = (config or {}).get("modlog_channel_id")
+    MOD_LOG_CHANNELS[guild_id] = (now, channel_id)
+    return channel_id
+
+
+async def set_mod_log_channel(guild_id: int, channel_id: int):
+    """Set and persist the moderation log channel"""
+    MOD_LOG_CHANNELS[guild_id] = (time.monotonic(), channel_id)
+    if _db:
+        await asyncio.to_thread(_db.set_guild_config, guild_id, modlog_channel_id=channel_id)
+
+
+# Log embed templates; _log_embed copies one and fills in the field values
+_KICK_LOG = (
+    discord.Embed(title="🦶 Member Kicked", color=0xED4245)
+    .add_field(name="Member", value="\u200b", inline=True)
+    .add_field(name="Moderator", value="\u200b", inline=True)
+    .add_field(name="Reason", value="\u200b", inline=False)
+)
+_BAN_LOG = (
+    discord.Embed(title="🔨 Member Banned", color=0x5D3FD3)
+    .add_field(name="Member", value="\u200b", inline=True)
+    .add_field(name="Moderator", value="\u200b", inline=True)
+    .add_field(name="Reason", value="\u200b", inline=False)
+    .add_field(name="Messages Deleted", value="\u200b", inline=True)
+)
+_UNBAN_LOG = (
+    discord.Embed(title="✅ Member Unbanned", color=0x57F287)
+    .add_field(name="User", value="\u200b", inline=True)
+    .add_field(name="Moderator", value="\u200b", inline=True)
+    .add_field(name="Reason", value="\u200b", inline=False)
+)
+_TIMEOUT_LOG = (
+    discord.Embed(title="⏰ Member Timed Out", color=0xFEE75C)
+    .add_field(name="Member", value="\u200b", inline=True)
+    .add_field(name="Moderator", value="\u200b", inline=True)
+    .add_field(name="Duration", value="\u200b", inline=True)
+    .add_field(name="Until", value="\u200b", inline=True)
+    .add_field(name="Reason", value="\u200b", inline=False)
+)
+_UNTIMEOUT_LOG = (
+    discord.Embed(title="✅ Timeout Removed", color=0x57F287)
+    .add_field(name="Member", value="\u200b", inline=True)
+    .add_field(name="Moderator", value="\u200b", inline=True)
+    .add_field(name="Reason", value="\u200b", inline=False)
+)
+_WARN_LOG = (
+    discord.Embed(title="⚠️ Member Warned", color=0xFEE75C)
+    .add_field(name="Member", value="\u200b", inline=True)
+    .add_field(name="Moderator", value="\u200b", inline=True)
+    .add_field(name="Total Warnings", value="\u200b", inline=True)
+    .add_field(name="Reason", value="\u200b", inline=False)
+)
+_CLEARWARNINGS_LOG = (
+    discord.Embed(title="🧹 Warnings Cleared", color=0x57F287)
+    .add_field(name="Member", value="\u200b", inline=True)
+    .add_field(name="Moderator", value="\u200b", inline=True)
+)
+_PURGE_LOG = (
+    discord.Embed(title="🧹 Messages Purged", color=0x57F287)
+    .add_field(name="Channel", value="\u200b", inline=True)
+    .add_field(name="Moderator", value="\u200b", inline=True)
+    .add_field(name="Amount", value="\u200b", inline=True)
+)
+
+
+def _log_embed(template: discord.Embed, *values: str, now: Optional[datetime] = None) -> discord.Embed:
+    """Copy a log template, stamp it and fill its fields in order"""
+    embed = template.copy()
+    embed.timestamp = now or datetime.utcnow()
+    # Fresh field dicts: the copy would otherwise share them with the template
+    embed._fields = [{**field, "value": value} for field, value in zip(template._fields, values)]
+    return embed
 
 
 async def log_moderation(guild: discord.Guild, embed: discord.Embed):
     """Log moderation action to configured channel"""
-    if guild.id in MOD_LOG_CHANNELS:
-        channel_id = MOD_LOG_CHANNELS[guild.id]
-        channel = guild.get_channel(channel_id)
-        if channel and isinstance(channel, discord.TextChannel):
-            try:
+    try:
+        channel_id = await _get_mod_log_channel_id(guild.id)
+        if channel_id:
+            channel = guild.get_channel(channel_id)
+            if channel and isinstance(channel, discord.TextChannel):
+                await _throttle(guild.id, "log")
                 await channel.send(embed=embed)
-            except:
-                pass
+    except Exception:
+        pass
 
 
-def add_warning(guild_id: int, user_id: int, reason: str, moderator: str):
-    """Add a warning to a user"""
-    if guild_id not in WARNINGS:
-        WARNINGS[guild_id] = {}
-    
-    if user_id not in WARNINGS[guild_id]:
-        WARNINGS[guild_id][user_id] = []
-    
-    WARNINGS[guild_id][user_id].append({
-        "reason": reason,
-        "moderator": moderator,
-        "timestamp": datetime.utcnow()
-    })
+# Strong refs to log sends running in the background
+_LOG_TASKS: "set[asyncio.Task]" = set()
 
 
-def get_warnings(guild_id: int, user_id: int) -> List[dict]:
-    """Get all warnings for a user"""
-    if guild_id not in WARNINGS:
-        return []
-    
-    if user_id not in WARNINGS[guild_id]:
-        return []
-    
-    return WARNINGS[guild_id][user_id]
+def spawn_log(guild: discord.Guild, embed: discord.Embed):
+    """Send a moderation log in the background; the command doesn't wait on it"""
+    task = asyncio.create_task(log_moderation(guild, embed))
+    _LOG_TASKS.add(task)
+    task.add_done_callback(_LOG_TASKS.discard)
 
 
-def clear_warnings(guild_id: int, user_id: int):
-    """Clear all warnings for a user"""
-    if guild_id in WARNINGS and user_id in WARNINGS[guild_id]:
-        del WARNINGS[guild_id][user_id]
+# Retries for idempotent moderation actions on Discord 5xx, on top of discord.py's own.
+# Commands defer before calling these, so the backoff doesn't race the interaction deadline.
+ACTION_RETRY_ATTEMPTS = 3
+ACTION_RETRY_BASE_DELAY = 0.25
+
+
+async def _with_retry(coro_factory):
+    """Await coro_factory(), retrying server errors with exponential backoff and jitter"""
+    for attempt in range(ACTION_RETRY_ATTEMPTS):
+        try:
+            return await coro_factory()
+        except discord.DiscordServerError:
+            if attempt == ACTION_RETRY_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(ACTION_RETRY_BASE_DELAY * 2 ** attempt + random.uniform(0, 0.1))
+
+
+async def _safe_dm(member: discord.Member, embed: discord.Embed):
+    """DM a member, ignoring closed DMs and other failures"""
+    try:
+        await _throttle(member.guild.id, "dm")
+        await member.send(embed=embed)
+    except Exception:
+        pass
+
+
+class WarningEntry(NamedTuple):
+    reason: str
+    moderator: str
+    timestamp: datetime
+    timestamp_str: str
+    field_value: str
+
+
+def _make_warning(reason: str, moderator: str, timestamp: datetime) -> WarningEntry:
+    # /warnings shows these as-is, so format once here rather than on every view
+    timestamp_str = timestamp.strftime("%Y-%m-%d %H:%M UTC")
+    return WarningEntry(
+        reason,
+        moderator,
+        timestamp,
+        timestamp_str,
+        "**Reason:** " + reason + "\n**By:** " + moderator + "\n**Date:** " + timestamp_str,
+    )
 
 
-async def auto_unmute(guild_id: int, user_id: int, duration: int):
-    """Auto-unmute user after duration (in seconds)"""
-    await asyncio.sleep(duration)
+def _warning_from_row(row: dict) -> WarningEntry:
+    return _make_warning(row["reason"], f"<@{row['moderator_id']}>", datetime.fromisoformat(row["created_at"]))
+
+
+async def get_warnings(guild_id: int, user_id: int) -> List[WarningEntry]:
+    """Get all warnings for a user, oldest first"""
+    key = (guild_id, user_id)
+    now = time.monotonic()
+    cached = WARNINGS.get(key)
+    if cached and now - cached[0] < WARNINGS_CACHE_TTL:
+        WARNINGS.move_to_end(key)
+        return cached[1]
     
-    # Remove from tasks
-    if guild_id in MUTE_TASKS and user_id in MUTE_TASKS[guild_id]:
-        del MUTE_TASKS[guild_id][user_id]
+    async with _db_lock:
+        rows = await asyncio.to_thread(_db.get_warnings, guild_id, user_id) if _db else []
+        # Rows come newest first
+        warnings = [_warning_from_row(row) for row in reversed(rows)]
+        # Writes still waiting in the queue aren't in those rows yet
+        for op in _pending_ops.get(key, ()):
+            if op[0] == "add":
+                warnings.append(_warning_from_row({"reason": op[4], "moderator_id": op[3], "created_at": op[5]}))
+            else:
+                warnings = []
+    WARNINGS[key] = (now, warnings)
+    WARNINGS.move_to_end(key)
+    while len(WARNINGS) > WARNINGS_CACHE_SIZE:
+        WARNINGS.popitem(last=False)
+    return warnings
+
+
+async def add_warning(
+    guild_id: int,
+    user_id: int,
+    reason: str,
+    moderator: str,
+    moderator_id: int = 0,
+    now: Optional[datetime] = None
+) -> List[WarningEntry]:
+    """Add a warning to a user, returns all their warnings"""
+    warnings = await get_warnings(guild_id, user_id)
+    now = now or datetime.utcnow()
+    warnings.append(_make_warning(reason, moderator, now))
+    _queue_write(("add", guild_id, user_id, moderator_id, reason, now.strftime("%Y-%m-%d %H:%M:%S")))
+    return warnings
+
+
+def clear_warnings(guild_id: int, user_id: int):
+    """Clear all warnings for a user"""
+    key = (guild_id, user_id)
+    WARNINGS[key] = (time.monotonic(), [])
+    WARNINGS.move_to_end(key)
+    _queue_write(("clear", guild_id, user_id))
 
 
 def setup_moderation_commands(bot):
     """Setup moderation slash commands"""
+    global _db, _writer_task
+    _db = bot.db
+    if _writer_task is None or _writer_task.done():
+        _writer_task = asyncio.create_task(_warning_writer())
+    
+    @bot.listen("on_guild_remove")
+    async def on_guild_remove(guild: discord.Guild):
+        # Per-guild state is otherwise kept for every guild the bot has ever been in
+        forget_guild(guild.id)
     
     @bot.tree.command(name="kick", description="Kick a member from the server")
     @app_commands.describe(member="Member to kick", reason="Reason for kick")
@@ -86,40 +361,43 @@ def setup_moderation_commands(bot):
             await interaction.response.send_message("❌ You cannot kick the server owner.", ephemeral=True)
             return
         
+        # The throttle and retries below can outlast the 3s interaction deadline
+        await interaction.response.defer(ephemeral=True)
+        
         try:
-            # DM user before kicking
-            try:
-                dm_embed = discord.Embed(
-                    title=f"Kicked from {interaction.guild.name}",
-                    description=f"**Reason:** {reason}",
-                    color=0xED4245,
-                    timestamp=datetime.utcnow()
-                )
-                dm_embed.set_footer(text=f"Kicked by {interaction.user.name}")
-                await member.send(embed=dm_embed)
-            except:
-                pass
+            # One timestamp for the DM and the log entry
+            now = datetime.utcnow()
+            
+            # DM user before kicking; afterwards there may be no shared server to DM through
+            dm_embed = discord.Embed(
+                title=f"Kicked from {interaction.guild.name}",
+                description=f"**Reason:** {reason}",
+                color=0xED4245,
+                timestamp=now
+            )
+            dm_embed.set_footer(text=f"Kicked by {interaction.user.name}")
+            await _safe_dm(member, dm_embed)
             
-            await member.kick(reason=f"{reason} | By {interaction.user.name}")
+            await _throttle(interaction.guild_id, "action")
+            await _with_retry(lambda: member.kick(reason=f"{reason} | By {interaction.user.name}"))
             
             # Log action
-            log_embed = discord.Embed(
-                title="🦶 Member Kicked",
-                color=0xED4245,
-                timestamp=datetime.utcnow()
+            log_embed = _log_embed(
+                _KICK_LOG,
+                f"{member.mention} ({member.id})",
+                interaction.user.mention,
+                reason,
+                now=now
             )
-            log_embed.add_field(name="Member", value=f"{member.mention} ({member.id})", inline=True)
-            log_embed.add_field(name="Moderator", value=interaction.user.mention, inline=True)
-            log_embed.add_field(name="Reason", value=reason, inline=False)
             log_embed.set_thumbnail(url=member.display_avatar.url)
             
-            await log_moderation(interaction.guild, log_embed)
-            await interaction.response.send_message(f"✅ Kicked {member.mention} - {reason}", ephemeral=True)
+            spawn_log(interaction.guild, log_embed)
+            await interaction.followup.send(f"✅ Kicked {member.mention} - {reason}", ephemeral=True)
         
         except discord.Forbidden:
-            await interaction.response.send_message("❌ I don't have permission to kick this member.", ephemeral=True)
+            await interaction.followup.send("❌ I don't have permission to kick this member.", ephemeral=True)
         except discord.HTTPException as e:
-            await interaction.response.send_message(f"❌ Failed to kick: {e}", ephemeral=True)
+            await interaction.followup.send(f"❌ Failed to kick: {e}", ephemeral=True)
     
     
     @bot.tree.command(name="ban", description="Ban a member from the server")
@@ -143,44 +421,47 @@ def setup_moderation_commands(bot):
             await interaction.response.send_message("❌ You cannot ban the server owner.", ephemeral=True)
             return
         
+        # The throttle and retries below can outlast the 3s interaction deadline
+        await interaction.response.defer(ephemeral=True)
+        
         try:
-            # DM user before banning
-            try:
-                dm_embed = discord.Embed(
-                    title=f"Banned from {interaction.guild.name}",
-                    description=f"**Reason:** {reason}",
-                    color=0x5D3FD3,
-                    timestamp=datetime.utcnow()
-                )
-                dm_embed.set_footer(text=f"Banned by {interaction.user.name}")
-                await member.send(embed=dm_embed)
-            except:
-                pass
+            # One timestamp for the DM and the log entry
+            now = datetime.utcnow()
             
-            await member.ban(
+            # DM user before banning; afterwards there may be no shared server to DM through
+            dm_embed = discord.Embed(
+                title=f"Banned from {interaction.guild.name}",
+                description=f"**Reason:** {reason}",
+                color=0x5D3FD3,
+                timestamp=now
+            )
+            dm_embed.set_footer(text=f"Banned by {interaction.user.name}")
+            await _safe_dm(member, dm_embed)
+            
+            await _throttle(interaction.guild_id, "action")
+            await _with_retry(lambda: member.ban(
                 reason=f"{reason} | By {interaction.user.name}",
                 delete_message_days=delete_days
-            )
+            ))
             
             # Log action
-            log_embed = discord.Embed(
-                title="🔨 Member Banned",
-                color=0x5D3FD3,
-                timestamp=datetime.utcnow()
+            log_embed = _log_embed(
+                _BAN_LOG,
+                f"{member.mention} ({member.id})",
+                interaction.user.mention,
+                reason,
+                f"{delete_days} days",
+                now=now
             )
-            log_embed.add_field(name="Member", value=f"{member.mention} ({member.id})", inline=True)
-            log_embed.add_field(name="Moderator", value=interaction.user.mention, inline=True)
-            log_embed.add_field(name="Reason", value=reason, inline=False)
-            log_embed.add_field(name="Messages Deleted", value=f"{delete_days} days", inline=True)
             log_embed.set_thumbnail(url=member.display_avatar.url)
             
-            await log_moderation(interaction.guild, log_embed)
-            await interaction.response.send_message(f"✅ Banned {member.mention} - {reason}", ephemeral=True)
+            spawn_log(interaction.guild, log_embed)
+            await interaction.followup.send(f"✅ Banned {member.mention} - {reason}", ephemeral=True)
         
         except discord.Forbidden:
-            await interaction.response.send_message("❌ I don't have permission to ban this member.", ephemeral=True)
+            await interaction.followup.send("❌ I don't have permission to ban this member.", ephemeral=True)
         except discord.HTTPException as e:
-            await interaction.response.send_message(f"❌ Failed to ban: {e}", ephemeral=True)
+            await interaction.followup.send(f"❌ Failed to ban: {e}", ephemeral=True)
     
     
     @bot.tree.command(name="unban", description="Unban a user by ID")
@@ -193,30 +474,31 @@ def setup_moderation_commands(bot):
             await interaction.response.send_message("❌ Invalid user ID.", ephemeral=True)
             return
         
+        # Server-error retries below can outlast the 3s interaction deadline
+        await interaction.response.defer(ephemeral=True)
+        
         try:
-            user = await bot.fetch_user(uid)
-            await interaction.guild.unban(user, reason=f"{reason} | By {interaction.user.name}")
+            user = bot.get_user(uid) or await bot.fetch_user(uid)
+            await _with_retry(lambda: interaction.guild.unban(user, reason=f"{reason} | By {interaction.user.name}"))
             
             # Log action
-            log_embed = discord.Embed(
-                title="✅ Member Unbanned",
-                color=0x57F287,
-                timestamp=datetime.utcnow()
+            log_embed = _log_embed(
+                _UNBAN_LOG,
+                f"{user.mention} ({user.id})",
+                interaction.user.mention,
+                reason
             )
-            log_embed.add_field(name="User", value=f"{user.mention} ({user.id})", inline=True)
-            log_embed.add_field(name="Moderator", value=interaction.user.mention, inline=True)
-            log_embed.add_field(name="Reason", value=reason, inline=False)
             log_embed.set_thumbnail(url=user.display_avatar.url)
             
-            await log_moderation(interaction.guild, log_embed)
-            await interaction.response.send_message(f"✅ Unbanned {user.mention}", ephemeral=True)
+            spawn_log(interaction.guild, log_embed)
+            await interaction.followup.send(f"✅ Unbanned {user.mention}", ephemeral=True)
         
         except discord.NotFound:
-            await interaction.response.send_message("❌ User not found or not banned.", ephemeral=True)
+            await interaction.followup.send("❌ User not found or not banned.", ephemeral=True)
         except discord.Forbidden:
-            await interaction.response.send_message("❌ I don't have permission to unban.", ephemeral=True)
+            await interaction.followup.send("❌ I don't have permission to unban.", ephemeral=True)
         except discord.HTTPException as e:
-            await interaction.response.send_message(f"❌ Failed to unban: {e}", ephemeral=True)
+            await interaction.followup.send(f"❌ Failed to unban: {e}", ephemeral=True)
     
     
     @bot.tree.command(name="timeout", description="Timeout a member (Discord native timeout)")
@@ -236,98 +518,101 @@ def setup_moderation_commands(bot):
             await interaction.response.send_message("❌ You cannot timeout this member (role hierarchy).", ephemeral=True)
             return
         
+        # Server-error retries below can outlast the 3s interaction deadline
+        await interaction.response.defer(ephemeral=True)
+        
         try:
-            until = discord.utils.utcnow() + timedelta(minutes=duration)
-            await member.timeout(until, reason=f"{reason} | By {interaction.user.name}")
+            now = discord.utils.utcnow()
+            until = now + timedelta(minutes=duration)
+            await _with_retry(lambda: member.timeout(until, reason=f"{reason} | By {interaction.user.name}"))
             
             # Log action
-            log_embed = discord.Embed(
-                title="⏰ Member Timed Out",
-                color=0xFEE75C,
-                timestamp=datetime.utcnow()
+            log_embed = _log_embed(
+                _TIMEOUT_LOG,
+                f"{member.mention} ({member.id})",
+                interaction.user.mention,
+                f"{duration} minutes",
+                discord.utils.format_dt(until, "F"),
+                reason,
+                now=now
             )
-            log_embed.add_field(name="Member", value=f"{member.mention} ({member.id})", inline=True)
-            log_embed.add_field(name="Moderator", value=interaction.user.mention, inline=True)
-            log_embed.add_field(name="Duration", value=f"{duration} minutes", inline=True)
-            log_embed.add_field(name="Until", value=discord.utils.format_dt(until, "F"), inline=True)
-            log_embed.add_field(name="Reason", value=reason, inline=False)
             log_embed.set_thumbnail(url=member.display_avatar.url)
             
-            await log_moderation(interaction.guild, log_embed)
-            await interaction.response.send_message(
+            spawn_log(interaction.guild, log_embed)
+            await interaction.followup.send(
                 f"✅ Timed out {member.mention} for {duration} minutes - {reason}",
                 ephemeral=True
             )
         
         except discord.Forbidden:
-            await interaction.response.send_message("❌ I don't have permission to timeout this member.", ephemeral=True)
+            await interaction.followup.send("❌ I don't have permission to timeout this member.", ephemeral=True)
         except discord.HTTPException as e:
-            await interaction.response.send_message(f"❌ Failed to timeout: {e}", ephemeral=True)
+            await interaction.followup.send(f"❌ Failed to timeout: {e}", ephemeral=True)
     
     
     @bot.tree.command(name="untimeout", description="Remove timeout from a member")
     @app_commands.describe(member="Member to remove timeout from", reason="Reason for removal")
     @app_commands.checks.has_permissions(moderate_members=True)
     async def untimeout_command(interaction: discord.Interaction, member: discord.Member, reason: str = "No reason provided"):
+        # Server-error retries below can outlast the 3s interaction deadline
+        await interaction.response.defer(ephemeral=True)
+        
         try:
-            await member.timeout(None, reason=f"{reason} | By {interaction.user.name}")
+            await _with_retry(lambda: member.timeout(None, reason=f"{reason} | By {interaction.user.name}"))
             
             # Log action
-            log_embed = discord.Embed(
-                title="✅ Timeout Removed",
-                color=0x57F287,
-                timestamp=datetime.utcnow()
+            log_embed = _log_embed(
+                _UNTIMEOUT_LOG,
+                f"{member.mention} ({member.id})",
+                interaction.user.mention,
+                reason
             )
-            log_embed.add_field(name="Member", value=f"{member.mention} ({member.id})", inline=True)
-            log_embed.add_field(name="Moderator", value=interaction.user.mention, inline=True)
-            log_embed.add_field(name="Reason", value=reason, inline=False)
             log_embed.set_thumbnail(url=member.display_avatar.url)
             
-            await log_moderation(interaction.guild, log_embed)
-            await interaction.response.send_message(f"✅ Removed timeout from {member.mention}", ephemeral=True)
+            spawn_log(interaction.guild, log_embed)
+            await interaction.followup.send(f"✅ Removed timeout from {member.mention}", ephemeral=True)
         
         except discord.Forbidden:
-            await interaction.response.send_message("❌ I don't have permission to remove timeout.", ephemeral=True)
+            await interaction.followup.send("❌ I don't have permission to remove timeout.", ephemeral=True)
         except discord.HTTPException as e:
-            await interaction.response.send_message(f"❌ Failed to remove timeout: {e}", ephemeral=True)
+            await interaction.followup.send(f"❌ Failed to remove timeout: {e}", ephemeral=True)
     
     
     @bot.tree.command(name="warn", description="Warn a member")
     @app_commands.describe(member="Member to warn", reason="Reason for warning")
     @app_commands.checks.has_permissions(manage_messages=True)
     async def warn_command(interaction: discord.Interaction, member: discord.Member, reason: str = "No reason provided"):
-        add_warning(interaction.guild_id, member.id, reason, str(interaction.user))
-        warnings = get_warnings(interaction.guild_id, member.id)
+        now = datetime.utcnow()
+        warnings = await add_warning(interaction.guild_id, member.id, reason, interaction.user.mention, interaction.user.id, now)
         
         # DM user
-        try:
-            dm_embed = discord.Embed(
-                title=f"⚠️ Warning in {interaction.guild.name}",
-                description=f"**Reason:** {reason}\n**Total Warnings:** {len(warnings)}",
-                color=0xFEE75C,
-                timestamp=datetime.utcnow()
-            )
-            dm_embed.set_footer(text=f"Warned by {interaction.user.name}")
-            await member.send(embed=dm_embed)
-        except:
-            pass
+        dm_embed = discord.Embed(
+            title=f"⚠️ Warning in {interaction.guild.name}",
+            description=f"**Reason:** {reason}\n**Total Warnings:** {len(warnings)}",
+            color=0xFEE75C,
+            timestamp=now
+        )
+        dm_embed.set_footer(text=f"Warned by {interaction.user.name}")
         
         # Log action
-        log_embed = discord.Embed(
-            title="⚠️ Member Warned",
-            color=0xFEE75C,
-            timestamp=datetime.utcnow()
+        log_embed = _log_embed(
+            _WARN_LOG,
+            f"{member.mention} ({member.id})",
+            interaction.user.mention,
+            str(len(warnings)),
+            reason,
+            now=now
         )
-        log_embed.add_field(name="Member", value=f"{member.mention} ({member.id})", inline=True)
-        log_embed.add_field(name="Moderator", value=interaction.user.mention, inline=True)
-        log_embed.add_field(name="Total Warnings", value=str(len(warnings)), inline=True)
-        log_embed.add_field(name="Reason", value=reason, inline=False)
         log_embed.set_thumbnail(url=member.display_avatar.url)
         
-        await log_moderation(interaction.guild, log_embed)
-        await interaction.response.send_message(
-            f"✅ Warned {member.mention} - {reason}\nTotal warnings: {len(warnings)}",
-            ephemeral=True
+        # The DM, log and reply don't depend on each other
+        spawn_log(interaction.guild, log_embed)
+        await asyncio.gather(
+            _safe_dm(member, dm_embed),
+            interaction.response.send_message(
+                f"✅ Warned {member.mention} - {reason}\nTotal warnings: {len(warnings)}",
+                ephemeral=True
+            )
         )
     
     
@@ -335,7 +620,7 @@ def setup_moderation_commands(bot):
     @app_commands.describe(member="Member to check warnings for")
     @app_commands.checks.has_permissions(manage_messages=True)
     async def warnings_command(interaction: discord.Interaction, member: discord.Member):
-        warnings = get_warnings(interaction.guild_id, member.id)
+        warnings = await get_warnings(interaction.guild_id, member.id)
         
         if not warnings:
             await interaction.response.send_message(f"{member.mention} has no warnings.", ephemeral=True)
@@ -348,12 +633,7 @@ def setup_moderation_commands(bot):
         embed.set_thumbnail(url=member.display_avatar.url)
         
         for idx, warning in enumerate(warnings, 1):
-            timestamp = warning["timestamp"].strftime("%Y-%m-%d %H:%M UTC")
-            embed.add_field(
-                name=f"Warning #{idx}",
-                value=f"**Reason:** {warning['reason']}\n**By:** {warning['moderator']}\n**Date:** {timestamp}",
-                inline=False
-            )
+            embed.add_field(name=f"Warning #{idx}", value=warning.field_value, inline=False)
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
     
@@ -365,16 +645,14 @@ def setup_moderation_commands(bot):
         clear_warnings(interaction.guild_id, member.id)
         
         # Log action
-        log_embed = discord.Embed(
-            title="🧹 Warnings Cleared",
-            color=0x57F287,
-            timestamp=datetime.utcnow()
+        log_embed = _log_embed(
+            _CLEARWARNINGS_LOG,
+            f"{member.mention} ({member.id})",
+            interaction.user.mention
         )
-        log_embed.add_field(name="Member", value=f"{member.mention} ({member.id})", inline=True)
-        log_embed.add_field(name="Moderator", value=interaction.user.mention, inline=True)
         log_embed.set_thumbnail(url=member.display_avatar.url)
         
-        await log_moderation(interaction.guild, log_embed)
+        spawn_log(interaction.guild, log_embed)
         await interaction.response.send_message(f"✅ Cleared all warnings for {member.mention}", ephemeral=True)
     
     
@@ -388,16 +666,14 @@ def setup_moderation_commands(bot):
             deleted = await interaction.channel.purge(limit=amount)
             
             # Log action
-            log_embed = discord.Embed(
-                title="🧹 Messages Purged",
-                color=0x57F287,
-                timestamp=datetime.utcnow()
+            log_embed = _log_embed(
+                _PURGE_LOG,
+                interaction.channel.mention,
+                interaction.user.mention,
+                str(len(deleted))
             )
-            log_embed.add_field(name="Channel", value=interaction.channel.mention, inline=True)
-            log_embed.add_field(name="Moderator", value=interaction.user.mention, inline=True)
-            log_embed.add_field(name="Amount", value=str(len(deleted)), inline=True)
             
-            await log_moderation(interaction.guild, log_embed)
+            spawn_log(interaction.guild, log_embed)
             await interaction.followup.send(f"✅ Deleted {len(deleted)} messages.", ephemeral=True)
         
         except discord.Forbidden:
@@ -410,7 +686,7 @@ def setup_moderation_commands(bot):
     @app_commands.describe(channel="Channel to send moderation logs to")
     @app_commands.checks.has_permissions(administrator=True)
     async def modlog_command(interaction: discord.Interaction, channel: discord.TextChannel):
-        MOD_LOG_CHANNELS[interaction.guild_id] = channel.id
+        await set_mod_log_channel(interaction.guild_id, channel.id)
         await interaction.response.send_message(f"✅ Moderation logs will be sent to {channel.mention}", ephemeral=True)
     
     
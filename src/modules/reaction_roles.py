@@ -1,17 +1,43 @@
 """
 Reaction roles system - assign roles when users react to messages.
 """
+import asyncio
+
 import discord
 from discord import app_commands
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+
+# Store reaction role configs: {guild_id: {message_id: {emoji: role_id}}}
+REACTION_ROLES: Dict[int, Dict[int, Dict[str, int]]] = {}
+
+# Same configs keyed the way reaction events identify emoji: {guild_id: {message_id: {emoji id or name: role_id}}}
+_ROLES_BY_EMOJI_KEY: Dict[int, Dict[int, Dict[int | str, int]]] = {}
 
+_EMPTY: Dict = {}
+# Set once the bot has logged in; reactions from this user are ignored
+BOT_USER_ID: int | None = None
 
-# Store reaction role configs: {guild_id: {message_id: [{emoji: str, role_id: int}]}}
-REACTION_ROLES: Dict[int, Dict[int, List[dict]]] = {}
+# Channel each panel was posted in: {message_id: channel_id}
+REACTION_ROLE_PANEL_CHANNELS: Dict[int, int] = {}
+
+# Database the configs are written through to; set in init_reaction_roles
+_db = None
+# The dashboard edits the reaction_roles table directly, so the bot re-reads it this often
+REACTION_ROLES_RELOAD_SECONDS = 30
+_reload_task: "asyncio.Task | None" = None
 
 
 def init_reaction_roles(bot):
     """Initialize reaction role system"""
+    global BOT_USER_ID, _db, _reload_task
+    if bot.user:
+        BOT_USER_ID = bot.user.id
+    
+    # Load saved panels so they keep working across restarts, then keep up with dashboard edits
+    _db = bot.db
+    if _db and _reload_task is None:
+        _reload_task = asyncio.create_task(_reload_reaction_roles_loop())
     
     @bot.listen("on_raw_reaction_add")
     async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
@@ -20,54 +46,96 @@ def init_reaction_roles(bot):
     @bot.listen("on_raw_reaction_remove")
     async def on_raw_reaction_remove(payload: discord.RawReactionActionEvent):
         await handle_reaction_role(bot, payload, add=False)
+    
+    @bot.listen("on_raw_message_delete")
+    async def on_raw_message_delete(payload: discord.RawMessageDeleteEvent):
+        REACTION_ROLE_PANEL_CHANNELS.pop(payload.message_id, None)
+        if payload.guild_id is None:
+            return
+        
+        # A deleted panel's roles can't be reacted for any more; drop them so restarts don't reload it
+        if remove_reaction_roles_for_message(payload.guild_id, payload.message_id) and _db:
+            await asyncio.to_thread(_db.delete_reaction_roles_for_message, payload.guild_id, payload.message_id)
+
+
+async def reload_reaction_roles():
+    """Rebuild the in-memory panels from the reaction_roles table"""
+    rows = await asyncio.to_thread(_db.get_all_reaction_roles)
+    REACTION_ROLES.clear()
+    _ROLES_BY_EMOJI_KEY.clear()
+    for guild_id, message_id, channel_id, emoji, role_id in rows:
+        add_reaction_role(guild_id, message_id, emoji, role_id)
+        REACTION_ROLE_PANEL_CHANNELS[message_id] = channel_id
+
+
+async def _reload_reaction_roles_loop():
+    while True:
+        try:
+            await reload_reaction_roles()
+        except Exception as e:
+            print(f"Error reloading reaction roles: {e}")
+        await asyncio.sleep(REACTION_ROLES_RELOAD_SECONDS)
 
 
 async def handle_reaction_role(bot, payload: discord.RawReactionActionEvent, add: bool):
     """Handle reaction role assignment/removal"""
-    # Skip if bot reaction
-    if payload.user_id == bot.user.id:
+    # Most reactions aren't on a panel, so check that first; the bot's own reactions are skipped too
+    emoji_roles = _ROLES_BY_EMOJI_KEY.get(payload.guild_id, _EMPTY).get(payload.message_id)
+    if emoji_roles is None or payload.user_id == BOT_USER_ID:
         return
     
-    guild_id = payload.guild_id
-    if not guild_id or guild_id not in REACTION_ROLES:
+    # Find matching role for this emoji, without stringifying it
+    emoji = payload.emoji
+    role_id = emoji_roles.get(emoji.id or emoji.name)
+    if role_id is None:
         return
     
-    message_id = payload.message_id
-    if message_id not in REACTION_ROLES[guild_id]:
-        return
-    
-    # Find matching role for this emoji
-    emoji_str = str(payload.emoji)
-    role_id = None
-    
-    for rr in REACTION_ROLES[guild_id][message_id]:
-        if rr["emoji"] == emoji_str:
-            role_id = rr["role_id"]
-            break
-    
-    if not role_id:
-        return
-    
-    # Get guild and member
-    guild = bot.get_guild(guild_id)
+    # Get guild, role and member; resolved per event since discord.py rebuilds them on re-identify
+    guild = bot.get_guild(payload.guild_id)
     if not guild:
         return
     
-    member = guild.get_member(payload.user_id)
-    if not member:
-        return
-    
     role = guild.get_role(role_id)
-    if not role:
+    member = guild.get_member(payload.user_id)
+    if not role or not member:
         return
     
+    _schedule_role_change(member, role, add)
+
+
+# Quick add/remove toggles on a panel collapse into one role change per member and role.
+REACTION_ROLE_DEBOUNCE = 1.0
+# {(guild_id, user_id, role_id): (latest add/remove, pending timer)}
+_PENDING_ROLE_CHANGES: Dict[tuple[int, int, int], tuple[bool, asyncio.TimerHandle]] = {}
+_ROLE_CHANGE_TASKS: "set[asyncio.Task]" = set()
+
+
+def _schedule_role_change(member: discord.Member, role: discord.Role, add: bool):
+    """Apply the member's final add/remove once reactions settle for REACTION_ROLE_DEBOUNCE"""
+    key = (member.guild.id, member.id, role.id)
+    pending = _PENDING_ROLE_CHANGES.get(key)
+    if pending:
+        pending[1].cancel()
+    loop = asyncio.get_running_loop()
+    handle = loop.call_later(REACTION_ROLE_DEBOUNCE, _flush_role_change, key, member, role)
+    _PENDING_ROLE_CHANGES[key] = (add, handle)
+
+
+def _flush_role_change(key: tuple[int, int, int], member: discord.Member, role: discord.Role):
+    add, _ = _PENDING_ROLE_CHANGES.pop(key)
+    task = asyncio.create_task(_apply_role_change(member, role, add))
+    _ROLE_CHANGE_TASKS.add(task)
+    task.add_done_callback(_ROLE_CHANGE_TASKS.discard)
+
+
+async def _apply_role_change(member: discord.Member, role: discord.Role, add: bool):
     # Add or remove role
     try:
         if add:
-            if role not in member.roles:
+            if member.get_role(role.id) is None:
                 await member.add_roles(role, reason="Reaction role assignment")
         else:
-            if role in member.roles:
+            if member.get_role(role.id) is not None:
                 await member.remove_roles(role, reason="Reaction role removal")
     except discord.Forbidden:
         pass
@@ -75,55 +143,69 @@ async def handle_reaction_role(bot, payload: discord.RawReactionActionEvent, add
         pass
 
 
+def _emoji_key(emoji: str) -> int | str:
+    """Custom emoji by id, unicode emoji by the character(s) themselves"""
+    partial = discord.PartialEmoji.from_str(emoji)
+    return partial.id or partial.name
+
+
 def add_reaction_role(guild_id: int, message_id: int, emoji: str, role_id: int):
     """Add a reaction role configuration"""
-    if guild_id not in REACTION_ROLES:
-        REACTION_ROLES[guild_id] = {}
-    
-    if message_id not in REACTION_ROLES[guild_id]:
-        REACTION_ROLES[guild_id][message_id] = []
-    
-    # Check if already exists
-    for rr in REACTION_ROLES[guild_id][message_id]:
-        if rr["emoji"] == emoji:
-            rr["role_id"] = role_id
-            return
-    
-    REACTION_ROLES[guild_id][message_id].append({
-        "emoji": emoji,
-        "role_id": role_id
-    })
+    REACTION_ROLES.setdefault(guild_id, {}).setdefault(message_id, {})[emoji] = role_id
+    _ROLES_BY_EMOJI_KEY.setdefault(guild_id, {}).setdefault(message_id, {})[_emoji_key(emoji)] = role_id
 
 
 def remove_reaction_role(guild_id: int, message_id: int, emoji: str):
     """Remove a reaction role configuration"""
-    if guild_id not in REACTION_ROLES:
-        return
-    
-    if message_id not in REACTION_ROLES[guild_id]:
-        return
-    
-    REACTION_ROLES[guild_id][message_id] = [
-        rr for rr in REACTION_ROLES[guild_id][message_id] if rr["emoji"] != emoji
-    ]
-    
-    # Clean up if empty
-    if not REACTION_ROLES[guild_id][message_id]:
-        del REACTION_ROLES[guild_id][message_id]
-    
-    if not REACTION_ROLES[guild_id]:
-        del REACTION_ROLES[guild_id]
+    for by_guild, key in ((REACTION_ROLES, emoji), (_ROLES_BY_EMOJI_KEY, _emoji_key(emoji))):
+        emoji_roles = by_guild.get(guild_id, {}).get(message_id)
+        if emoji_roles is None:
+            continue
+        
+        emoji_roles.pop(key, None)
+        
+        # Clean up if empty
+        if not emoji_roles:
+            messages = by_guild[guild_id]
+            messages.pop(message_id, None)
+            if not messages:
+                by_guild.pop(guild_id, None)
+
+
+def remove_reaction_roles_for_message(guild_id: int, message_id: int) -> bool:
+    """Remove every reaction role on a message; returns whether it had any"""
+    found = False
+    for by_guild in (REACTION_ROLES, _ROLES_BY_EMOJI_KEY):
+        messages = by_guild.get(guild_id)
+        if messages is None or messages.pop(message_id, None) is None:
+            continue
+        found = True
+        if not messages:
+            by_guild.pop(guild_id, None)
+    return found
 
 
 def get_reaction_roles(guild_id: int, message_id: int) -> List[dict]:
     """Get all reaction roles for a message"""
-    if guild_id not in REACTION_ROLES:
-        return []
-    
-    if message_id not in REACTION_ROLES[guild_id]:
-        return []
-    
-    return REACTION_ROLES[guild_id][message_id]
+    emoji_roles = REACTION_ROLES.get(guild_id, {}).get(message_id, {})
+    return [{"emoji": emoji, "role_id": role_id} for emoji, role_id in emoji_roles.items()]
+
+
+async def _fetch_panel_message(
+    interaction: discord.Interaction,
+    msg_id: int,
+    channel: Optional[discord.TextChannel]
+) -> Optional[discord.Message]:
+    """Fetch a panel message from the given channel, the channel it was posted in, or the current one"""
+    if channel is None:
+        channel_id = REACTION_ROLE_PANEL_CHANNELS.get(msg_id)
+        channel = (interaction.guild.get_channel(channel_id) if channel_id else None) or interaction.channel
+    try:
+        message = await channel.fetch_message(msg_id)
+    except (discord.HTTPException, AttributeError):
+        return None
+    REACTION_ROLE_PANEL_CHANNELS[msg_id] = message.channel.id
+    return message
 
 
 def setup_reaction_role_commands(bot):
@@ -150,6 +232,7 @@ def setup_reaction_role_commands(bot):
         embed.set_footer(text="React to get your roles!")
         
         message = await channel.send(embed=embed)
+        REACTION_ROLE_PANEL_CHANNELS[message.id] = channel.id
         
         await interaction.response.send_message(
             f"✅ Reaction role panel created! Message ID: `{message.id}`\n"
@@ -162,14 +245,16 @@ def setup_reaction_role_commands(bot):
     @app_commands.describe(
         message_id="Message ID to add the reaction role to",
         emoji="Emoji to react with",
-        role="Role to assign"
+        role="Role to assign",
+        channel="Channel the message is in (defaults to where the panel was created, or this channel)"
     )
     @app_commands.checks.has_permissions(manage_roles=True)
     async def reactionrole_add(
         interaction: discord.Interaction,
         message_id: str,
         emoji: str,
-        role: discord.Role
+        role: discord.Role,
+        channel: Optional[discord.TextChannel] = None
     ):
         try:
             msg_id = int(message_id)
@@ -177,17 +262,10 @@ def setup_reaction_role_commands(bot):
             await interaction.response.send_message("Invalid message ID.", ephemeral=True)
             return
         
-        # Try to fetch message
-        message = None
-        for channel in interaction.guild.text_channels:
-            try:
-                message = await channel.fetch_message(msg_id)
-                break
-            except:
-                continue
+        message = await _fetch_panel_message(interaction, msg_id, channel)
         
         if not message:
-            await interaction.response.send_message("Message not found.", ephemeral=True)
+            await interaction.response.send_message("Message not found. Pass the channel it's in.", ephemeral=True)
             return
         
         # Add reaction to message
@@ -199,6 +277,10 @@ def setup_reaction_role_commands(bot):
         
         # Store configuration
         add_reaction_role(interaction.guild_id, msg_id, emoji, role.id)
+        if _db:
+            await asyncio.to_thread(
+                _db.add_reaction_role, interaction.guild_id, msg_id, message.channel.id, emoji, role.id
+            )
         
         # Update embed if it's an embed message
         if message.embeds:
@@ -220,13 +302,15 @@ def setup_reaction_role_commands(bot):
     @bot.tree.command(name="reactionrole_remove", description="Remove a reaction role from a message")
     @app_commands.describe(
         message_id="Message ID to remove the reaction role from",
-        emoji="Emoji to remove"
+        emoji="Emoji to remove",
+        channel="Channel the message is in (defaults to where the panel was created, or this channel)"
     )
     @app_commands.checks.has_permissions(manage_roles=True)
     async def reactionrole_remove(
         interaction: discord.Interaction,
         message_id: str,
-        emoji: str
+        emoji: str,
+        channel: Optional[discord.TextChannel] = None
     ):
         try:
             msg_id = int(message_id)
@@ -234,17 +318,10 @@ def setup_reaction_role_commands(bot):
             await interaction.response.send_message("Invalid message ID.", ephemeral=True)
             return
         
-        # Try to fetch message
-        message = None
-        for channel in interaction.guild.text_channels:
-            try:
-                message = await channel.fetch_message(msg_id)
-                break
-            except:
-                continue
+        message = await _fetch_panel_message(interaction, msg_id, channel)
         
         if not message:
-            await interaction.response.send_message("Message not found.", ephemeral=True)
+            await interaction.response.send_message("Message not found. Pass the channel it's in.", ephemeral=True)
             return
         
         # Remove reaction from message
@@ -255,6 +332,8 @@ def setup_reaction_role_commands(bot):
         
         # Remove configuration
         remove_reaction_role(interaction.guild_id, msg_id, emoji)
+        if _db:
+            await asyncio.to_thread(_db.delete_reaction_role, interaction.guild_id, msg_id, emoji)
         
         await interaction.response.send_message(
             f"✅ Removed {emoji} from message `{msg_id}`",
@@ -276,12 +355,12 @@ def setup_reaction_role_commands(bot):
             color=0x5865F2
         )
         
-        for message_id, roles in REACTION_ROLES[guild_id].items():
+        for message_id, emoji_roles in REACTION_ROLES[guild_id].items():
             role_list = []
-            for rr in roles:
-                role = interaction.guild.get_role(rr["role_id"])
-                role_name = role.mention if role else f"Unknown Role ({rr['role_id']})"
-                role_list.append(f"{rr['emoji']} → {role_name}")
+            for emoji, role_id in emoji_roles.items():
+                role = interaction.guild.get_role(role_id)
+                role_name = role.mention if role else f"Unknown Role ({role_id})"
+                role_list.append(f"{emoji} → {role_name}")
             
             embed.add_field(
                 name=f"Message ID: {message_id}",
@@ -1,37 +1,79 @@
-from typing import Any, Dict, List
+import asyncio
+from typing import Any, Dict, List, Tuple
 
 import discord
 
+# Client-side cap on in-flight create calls; discord.py's rate limiter still handles 429s.
+TEMPLATE_BUILD_CONCURRENCY = 5
 
-async def build_server_from_template(guild: discord.Guild, template: Dict[str, Any]) -> None:
-    role_id_map = await _ensure_roles(guild, template.get("roles", []))
+
+async def build_server_from_template(
+    guild: discord.Guild, template: Dict[str, Any]
+) -> Tuple[List[Tuple[str, str, discord.HTTPException]], List[Tuple[str, str, discord.HTTPException]]]:
+    """Build the template; returns the ("Roles", role, error) and (category, channel, error) Discord rejected"""
+    role_id_map, role_failures = await _ensure_roles(guild, template.get("roles", []))
+    sem = asyncio.Semaphore(TEMPLATE_BUILD_CONCURRENCY)
+    overwrite_cache: Dict[tuple, Dict[discord.Role, discord.PermissionOverwrite]] = {}
+    failures: List[Tuple[str, str, discord.HTTPException]] = []
 
     for category in template.get("categories", []):
         category_name = _sanitize_name(category.get("name") or "Category")
         category_channel = await guild.create_category(category_name)
 
-        for channel_data in category.get("channels", []):
-            name = _sanitize_name(channel_data.get("name") or "channel")
-            is_voice = _is_voice_type(channel_data.get("type"))
-            overwrites = _build_overwrites(channel_data.get("overwrites"), guild, role_id_map)
-
-            if is_voice:
-                await guild.create_voice_channel(
-                    name=name,
-                    category=category_channel,
-                    overwrites=overwrites,
-                    reason="Channel Manager template build",
-                )
-            else:
-                await _create_text_channel_safe(
-                    guild,
-                    name=name,
-                    category=category_channel,
-                    topic=channel_data.get("topic"),
-                    nsfw=bool(channel_data.get("nsfw")),
-                    slowmode=channel_data.get("slowmode") or 0,
-                    overwrites=overwrites,
+        # Explicit positions keep the template order even though the creates finish out of order.
+        # One rejected channel shouldn't abort its siblings or the remaining categories.
+        channels = category.get("channels", [])
+        results = await asyncio.gather(
+            *(
+                _create_channel_from_template(
+                    guild, category_channel, channel_data, position, role_id_map, overwrite_cache, sem
                 )
+                for position, channel_data in enumerate(channels)
+            ),
+            return_exceptions=True,
+        )
+        for channel_data, result in zip(channels, results):
+            if isinstance(result, discord.HTTPException):
+                failures.append((category_name, _sanitize_name(channel_data.get("name") or "channel"), result))
+            elif isinstance(result, BaseException):
+                raise result
+
+    return role_failures, failures
+
+
+async def _create_channel_from_template(
+    guild: discord.Guild,
+    category: discord.CategoryChannel,
+    channel_data: Dict[str, Any],
+    position: int,
+    role_id_map: Dict[str, int],
+    overwrite_cache: Dict[tuple, Dict[discord.Role, discord.PermissionOverwrite]],
+    sem: asyncio.Semaphore,
+) -> None:
+    name = _sanitize_name(channel_data.get("name") or "channel")
+    is_voice = _is_voice_type(channel_data.get("type"))
+    overwrites = _cached_overwrites(channel_data.get("overwrites"), guild, role_id_map, overwrite_cache)
+
+    async with sem:
+        if is_voice:
+            await guild.create_voice_channel(
+                name=name,
+                category=category,
+                position=position,
+                overwrites=overwrites,
+                reason="Channel Manager template build",
+            )
+        else:
+            await _create_text_channel_safe(
+                guild,
+                name=name,
+                category=category,
+                topic=channel_data.get("topic"),
+                nsfw=bool(channel_data.get("nsfw")),
+                slowmode=channel_data.get("slowmode") or 0,
+                overwrites=overwrites,
+                position=position,
+            )
 
 
 async def create_roles(guild: discord.Guild, roles: List[Dict[str, Any]]) -> List[discord.Role]:
@@ -56,7 +98,9 @@ async def template_from_guild(guild: discord.Guild) -> Dict[str, Any]:
     channels = await guild.fetch_channels()
 
     role_templates: List[Dict[str, Any]] = []
-    for role in sorted(roles, key=lambda r: r.position):
+    roles.sort(key=lambda r: r.position)
+    channels.sort(key=lambda c: c.position)
+    for role in roles:
         role_templates.append(
             {
                 "refId": str(role.id),
@@ -71,11 +115,11 @@ async def template_from_guild(guild: discord.Guild) -> Dict[str, Any]:
         )
 
     category_map: Dict[int, Dict[str, Any]] = {}
-    for channel in sorted(channels, key=lambda c: c.position):
+    for channel in channels:
         if isinstance(channel, discord.CategoryChannel):
             category_map[channel.id] = {"name": channel.name, "channels": []}
 
-    for channel in sorted(channels, key=lambda c: c.position):
+    for channel in channels:
         parent_id = getattr(channel, "category_id", None)
         if not parent_id or parent_id not in category_map or isinstance(channel, discord.CategoryChannel):
             continue
@@ -132,13 +176,66 @@ def _build_overwrites(overwrites_data: Any, guild: discord.Guild, role_map: Dict
     return overwrites
 
 
-async def _ensure_roles(guild: discord.Guild, role_templates: List[Dict[str, Any]]) -> Dict[str, int]:
+def _cached_overwrites(
+    overwrites_data: Any,
+    guild: discord.Guild,
+    role_map: Dict[str, int],
+    cache: Dict[tuple, Dict[discord.Role, discord.PermissionOverwrite]],
+) -> Dict[discord.Role, discord.PermissionOverwrite]:
+    # Templates reuse the same overwrite block across many channels; roles don't change mid-build.
+    key = tuple((str(ow.get("roleRefId")), str(ow.get("allow")), str(ow.get("deny"))) for ow in overwrites_data or ())
+    overwrites = cache.get(key)
+    if overwrites is None:
+        overwrites = cache[key] = _build_overwrites(overwrites_data, guild, role_map)
+    return overwrites
+
+
+async def _ensure_roles(
+    guild: discord.Guild, role_templates: List[Dict[str, Any]]
+) -> Tuple[Dict[str, int], List[Tuple[str, str, discord.HTTPException]]]:
     mapping: Dict[str, int] = {"everyone": guild.default_role.id}
+    to_create: List[Dict[str, Any]] = []
     for tpl in role_templates:
         if tpl.get("isEveryone") or str(tpl.get("refId")) == str(guild.default_role.id):
             mapping[str(tpl.get("refId"))] = guild.default_role.id
-            continue
-        role = await guild.create_role(
+        else:
+            to_create.append(tpl)
+
+    sem = asyncio.Semaphore(TEMPLATE_BUILD_CONCURRENCY)
+    results = await asyncio.gather(
+        *(_create_role_from_template(guild, tpl, sem) for tpl in to_create),
+        return_exceptions=True,
+    )
+    created: List[discord.Role] = []
+    failures: List[Tuple[str, str, discord.HTTPException]] = []
+    for tpl, result in zip(to_create, results):
+        if isinstance(result, discord.HTTPException):
+            failures.append(("Roles", tpl.get("name") or "role", result))
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            mapping[str(tpl.get("refId"))] = result.id
+            created.append(result)
+
+    # The creates finish in any order; put the new roles back in template order (lowest first) above @everyone.
+    if len(created) > 1:
+        try:
+            await guild.edit_role_positions(
+                {role: position for position, role in enumerate(created, start=1)},
+                reason="Channel Manager role mapping",
+            )
+        except discord.HTTPException as error:
+            failures.append(("Roles", "role order", error))
+    return mapping, failures
+
+
+async def _create_role_from_template(
+    guild: discord.Guild,
+    tpl: Dict[str, Any],
+    sem: asyncio.Semaphore,
+) -> discord.Role:
+    async with sem:
+        return await guild.create_role(
             name=tpl.get("name") or "role",
             colour=discord.Colour(tpl.get("color") or 0),
             hoist=bool(tpl.get("hoist")),
@@ -146,8 +243,6 @@ async def _ensure_roles(guild: discord.Guild, role_templates: List[Dict[str, Any
             permissions=_normalize_permissions(tpl.get("permissions")),
             reason="Channel Manager role mapping",
         )
-        mapping[str(tpl.get("refId"))] = role.id
-    return mapping
 
 
 def _normalize_permissions(value: Any) -> discord.Permissions:
@@ -180,6 +275,7 @@ async def _create_text_channel_safe(
     nsfw: bool,
     slowmode: int,
     overwrites: Dict[discord.Role, discord.PermissionOverwrite],
+    position: int | None = None,
 ) -> discord.TextChannel:
     payload = {
         "name": name,
@@ -190,6 +286,8 @@ async def _create_text_channel_safe(
         "overwrites": overwrites,
         "reason": "Channel Manager template build",
     }
+    if position is not None:
+        payload["position"] = position
     try:
         return await guild.create_text_channel(**payload)
     except discord.HTTPException:
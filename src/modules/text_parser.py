@@ -37,6 +37,8 @@ def parse_text_structure(raw: str) -> Dict[str, Any]:
         current_category["channels"].append(channel)
 
     total_channels = sum(len(cat["channels"]) for cat in template["categories"])
+    template["_category_count"] = len(template["categories"])
+    template["_channel_count"] = total_channels
     template["summary"] = f"{len(template['categories'])} categories / {total_channels} channels"
     return template
 
@@ -1,6 +1,9 @@
-from typing import Any, Dict
+from types import MappingProxyType
+from typing import Any, Dict, Mapping
 
 import os
+import re
+
 import discord
 
 DEFAULT_VERIFY_BANNER = os.getenv(
@@ -17,6 +20,8 @@ VERIFY_DEFAULT: Dict[str, Any] = {
     "description": "Click verify to unlock chat access. This keeps the server safe from spam.",
 }
 
+_VERIFY_DEFAULT_VIEW: Mapping[str, Any] = MappingProxyType(VERIFY_DEFAULT)
+
 VERIFY_STATE: Dict[int, Dict[str, Any]] = {}
 
 
@@ -25,13 +30,15 @@ def init_verify_state(bot: discord.Client) -> None:
 
 
 def get_verify_config(guild_id: int | None) -> Dict[str, Any]:
-    if guild_id is None:
-        return {**VERIFY_DEFAULT}
-    base = VERIFY_STATE.get(guild_id)
-    if not base:
-        return {**VERIFY_DEFAULT}
-    merged = {**VERIFY_DEFAULT, **base}
-    return merged
+    # Stored configs are already merged over VERIFY_DEFAULT, so a copy is all callers need
+    base = VERIFY_STATE.get(guild_id) if guild_id is not None else None
+    return (base or VERIFY_DEFAULT).copy()
+
+
+def get_verify_config_view(guild_id: int | None) -> Mapping[str, Any]:
+    """Read-only config for callers that don't modify it; avoids the copy"""
+    base = VERIFY_STATE.get(guild_id) if guild_id is not None else None
+    return MappingProxyType(base) if base else _VERIFY_DEFAULT_VIEW
 
 
 def update_verify_config(guild_id: int | None, config: Dict[str, Any]) -> None:
@@ -51,19 +58,18 @@ def _sanitize_config(config: Dict[str, Any]) -> Dict[str, Any]:
     return config
 
 
+# base64 data URI, or an http(s) URL whose path (before any query string) ends in an image extension
+_IMAGE_LINK_RE = re.compile(
+    r"data:image/.*?base64,|https?://[^?]*\.(?:png|jpe?g|webp|gif)(?:\?|\Z)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
 def _is_image_link(url: str) -> bool:
-    if not url:
-        return False
-    lowered = url.lower()
-    if lowered.startswith("data:image/") and "base64," in lowered:
-        return True
-    if not lowered.startswith(("http://", "https://")):
-        return False
-    trimmed = lowered.split("?", 1)[0]
-    return trimmed.endswith((".png", ".jpg", ".jpeg", ".webp", ".gif"))
+    return bool(url) and _IMAGE_LINK_RE.match(url) is not None
 
 
-def build_verify_embed(config: Dict[str, Any]) -> discord.Embed:
+def build_verify_embed(config: Mapping[str, Any]) -> discord.Embed:
     embed = discord.Embed(
         title=config.get("title") or "Verify to access",
         description=config.get("description") or VERIFY_DEFAULT["description"],
@@ -90,7 +96,7 @@ async def handle_verify_button(interaction: discord.Interaction) -> bool:
         await interaction.response.send_message("This button works only in a server.", ephemeral=True)
         return True
 
-    config = get_verify_config(interaction.guild_id)
+    config = get_verify_config_view(interaction.guild_id)
     verified_role_id = config.get("verifiedRole")
     unverified_role_id = config.get("unverifiedRole")
     if not verified_role_id: